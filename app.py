@@ -1,22 +1,31 @@
 """Streamlit web UI for Telegram Voice Transcriber."""
 from __future__ import annotations
 
+import asyncio
 import logging
+import queue
+import threading
 import streamlit as st
 from pathlib import Path
 from datetime import date, timedelta
 
-from telegram_voice_transcriber.async_helpers import run_async
+from telegram_voice_transcriber.async_helpers import run_async, submit_async
 from telegram_voice_transcriber.web_auth import WebAuthManager, AuthState
-from telegram_voice_transcriber.tg_client import list_dialogs, TelegramCollector
-from telegram_voice_transcriber.config import build_app_config
+from telegram_voice_transcriber.tg_client import CollectionResult, list_dialogs, TelegramCollector
+from telegram_voice_transcriber.config import AppConfig, build_app_config
 from telegram_voice_transcriber.download import MediaDownloader
 from telegram_voice_transcriber.dry_run import DryRunReport
 from telegram_voice_transcriber.export_md import MarkdownExporter
-from telegram_voice_transcriber.filters import FilterConfig, MessageType
+from telegram_voice_transcriber.filters import FilterConfig
 from telegram_voice_transcriber.pipeline import PipelineOptions, ProcessingPipeline
-from telegram_voice_transcriber.state import ProcessingState
-from telegram_voice_transcriber.transcribe import WhisperTranscriber
+from telegram_voice_transcriber.state import StateStore, TranscriptCache, open_state
+from telegram_voice_transcriber.transcribe import (
+    WhisperTranscriber,
+    faster_whisper_module,
+    parallel_workers,
+    replica_options,
+    select_compute_type,
+)
 from telegram_voice_transcriber.writer import FileWriter
 
 logger = logging.getLogger("webui")
@@ -32,10 +41,16 @@ if "auth_manager" not in st.session_state:
     st.session_state.auth_manager = WebAuthManager()
 if "dialogs" not in st.session_state:
     st.session_state.dialogs = []
+if "dialog_names" not in st.session_state:
+    st.session_state.dialog_names = ()
+if "dialog_ids" not in st.session_state:
+    st.session_state.dialog_ids = ()
 if "processing" not in st.session_state:
     st.session_state.processing = False
-if "result_markdown" not in st.session_state:
-    st.session_state.result_markdown = None
+if "result_path" not in st.session_state:
+    st.session_state.result_path = None
+if "result_preview" not in st.session_state:
+    st.session_state.result_preview = None
 if "since_date" not in st.session_state:
     st.session_state.since_date = date.today() - timedelta(days=7)
 if "until_date" not in st.session_state:
@@ -46,6 +61,32 @@ if "logging_configured" not in st.session_state:
     st.session_state.logging_configured = False
 
 
+@st.cache_resource(show_spinner=False)
+def get_whisper_model(model_size: str, device: str, compute_type: str, models_dir: Path):
+    """Load a Whisper model once per process and reuse it across reruns."""
+    return faster_whisper_module().WhisperModel(
+        model_size,
+        device=device,
+        compute_type=compute_type,
+        download_root=str(models_dir),
+        **replica_options(device),
+    )
+
+
+@st.cache_resource(show_spinner=False)
+def prewarm_faster_whisper() -> threading.Thread:
+    """Import faster-whisper in the background so the first run doesn't pay for it."""
+    thread = threading.Thread(target=faster_whisper_module, name="faster-whisper-import", daemon=True)
+    thread.start()
+    return thread
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def load_dialogs(user_id: int, _client) -> list[dict]:
+    """Fetch the dialog list, cached per logged-in user for a few minutes."""
+    return run_async(list_dialogs(_client))
+
+
 def main():
     _setup_logging()
     st.title("🎙️ Telegram Voice Transcriber")
@@ -65,6 +106,7 @@ def main():
         render_setup_instructions()
 
 
+@st.fragment
 def render_auth_section(auth: WebAuthManager):
     """Render the authentication sidebar based on current state."""
 
@@ -125,6 +167,8 @@ def render_auth_section(auth: WebAuthManager):
             run_async(auth.disconnect())
             st.session_state.auth_manager = WebAuthManager()
             st.session_state.dialogs = []
+            st.session_state.dialog_names = ()
+            st.session_state.dialog_ids = ()
             st.rerun()
 
     st.divider()
@@ -148,6 +192,7 @@ def render_setup_instructions():
         """)
 
 
+@st.fragment
 def render_session_controls(auth: WebAuthManager):
     """Session export/import to avoid repeated logins."""
     st.markdown("🗝️ Session sichern/restore")
@@ -221,13 +266,19 @@ def _apply_date_preset(preset: str) -> None:
         st.session_state.until_date = today
 
 
+@st.fragment
 def render_transcription_ui(auth: WebAuthManager):
     """Main transcription interface when authenticated."""
+    prewarm_faster_whisper()
 
     # Load dialogs if not loaded
     if not st.session_state.dialogs:
         with st.spinner("Loading your chats..."):
-            st.session_state.dialogs = run_async(list_dialogs(auth.client))
+            dialogs = load_dialogs(auth.user_info["id"], auth.client)
+            st.session_state.dialogs = dialogs
+            # Immutable parallel arrays built once per load; reruns only index into them.
+            st.session_state.dialog_names = tuple(d["name"] for d in dialogs)
+            st.session_state.dialog_ids = tuple(d["id"] for d in dialogs)
 
     col1, col2 = st.columns([2, 1])
 
@@ -235,10 +286,11 @@ def render_transcription_ui(auth: WebAuthManager):
         st.subheader("📋 Configuration")
 
         # Chat selection
-        dialog_options = {d["name"]: d["id"] for d in st.session_state.dialogs}
-        selected_chat = st.selectbox(
+        dialog_names = st.session_state.dialog_names
+        selected_index = st.selectbox(
             "Select chat",
-            options=list(dialog_options.keys()),
+            options=range(len(dialog_names)),
+            format_func=dialog_names.__getitem__,
             help="Choose which chat to transcribe"
         )
 
@@ -292,41 +344,50 @@ def render_transcription_ui(auth: WebAuthManager):
             index=2,
             help="Larger = more accurate but slower"
         )
+        batch_size = st.slider(
+            "Batch size",
+            min_value=1,
+            max_value=32,
+            value=16,
+            help="Audio segments decoded per forward pass. Lower this if you run out of memory.",
+        )
         dry_run = st.checkbox("Dry run (preview only)", value=True)
 
     st.divider()
 
     # Process button
     if st.button("🚀 Start Transcription", type="primary", use_container_width=True):
-        if not selected_chat:
+        if selected_index is None:
             st.error("Please select a chat")
             return
 
         process_transcription(
             auth=auth,
-            chat_id=dialog_options[selected_chat],
-            chat_name=selected_chat,
+            chat_id=st.session_state.dialog_ids[selected_index],
+            chat_name=dialog_names[selected_index],
             since_date=st.session_state.since_date,
             until_date=st.session_state.until_date,
             message_types=message_types,
             include_self=include_self,
             language=language,
             model_size=model_size,
+            batch_size=batch_size,
             dry_run=dry_run,
         )
 
     # Show results if available
-    if st.session_state.result_markdown:
+    result_path: Path | None = st.session_state.result_path
+    if result_path and result_path.exists():
         st.divider()
         st.subheader("📄 Result")
         st.download_button(
             "⬇️ Download Markdown",
-            data=st.session_state.result_markdown,
+            data=result_path.read_bytes,  # read only when the user clicks
             file_name=f"transcript-{st.session_state.since_date}-{st.session_state.until_date}.md",
             mime="text/markdown",
         )
         with st.expander("Preview"):
-            st.markdown(st.session_state.result_markdown[:5000] + "..." if len(st.session_state.result_markdown) > 5000 else st.session_state.result_markdown)
+            st.markdown(st.session_state.result_preview or "")
 
 
 def process_transcription(
@@ -339,6 +400,7 @@ def process_transcription(
     include_self: bool,
     language: str,
     model_size: str,
+    batch_size: int,
     dry_run: bool,
 ):
     """Run the transcription pipeline with progress updates."""
@@ -365,24 +427,26 @@ def process_transcription(
         base_dir=base_dir,
         since_date=since_date.strftime("%Y-%m-%d"),
         until_date=until_exclusive.strftime("%Y-%m-%d"),
+        batch_size=batch_size,
     )
 
     with st.status("Processing...", expanded=True) as status:
         # Collect messages
         st.write("📥 Collecting messages from Telegram...")
         collector = TelegramCollector(auth.client)
-        collector_filter = FilterConfig(
+        # Filter once during collection; the pipeline then skips re-filtering.
+        message_filter = FilterConfig(
             allowed_sender_ids=None,
-            allowed_types=set(MessageType(t) for t in message_types),
+            allowed_types=frozenset(config.include_types),
             year=None,
-            include_self=True,
+            include_self=include_self,
         )
 
-        collection = run_async(collector.collect(
-            chat_identifier=chat_id,
-            filter_config=collector_filter,
-            since=config.date_range.since,
-            until=config.date_range.until,
+        collection, state = run_async(_collect_with_state(
+            collector,
+            chat_id=chat_id,
+            message_filter=message_filter,
+            config=config,
         ))
 
         st.write(f"Found {len(collection.messages)} messages")
@@ -393,8 +457,17 @@ def process_transcription(
             logger.info("No messages found for chat=%s in range %s-%s", chat_name, since_date, until_date)
             return
 
+        # Drop messages handled by an earlier run before anything gets downloaded
+        processed = state.processed_ids
+        pending = [m for m in collection.messages if m.message_id not in processed]
+        if len(pending) < len(collection.messages):
+            st.write(f"Skipping {len(collection.messages) - len(pending)} already processed messages")
+        if not pending:
+            status.update(label="All messages already processed", state="complete")
+            logger.info("Nothing new to process for chat=%s", chat_name)
+            return
+
         # Setup pipeline
-        state = ProcessingState(config.paths.state_path)
         downloader = MediaDownloader(client=auth.client, base_dir=config.paths.cache_dir)
         exporter = MarkdownExporter(
             chat_title=chat_name,
@@ -404,30 +477,40 @@ def process_transcription(
         )
         dry_run_report = DryRunReport(chat_title=chat_name, year=year)
 
-        # Determine sender filtering
-        sender_ids = {m.sender_id for m in collection.messages if m.sender_id}
-        if collection.self_user_id and not include_self:
-            sender_ids.discard(collection.self_user_id)
-
         # Load Whisper model if needed
         if not dry_run:
-            st.write(f"🤖 Loading Whisper model ({model_size})...")
-            from faster_whisper import WhisperModel
+            device, compute_type = select_compute_type(config.device)
+            compute_type = config.compute_type or compute_type
+            st.write(f"🤖 Loading Whisper model ({model_size}, {device}/{compute_type})...")
+            logger.info("Whisper model=%s device=%s compute_type=%s", model_size, device, compute_type)
             models_dir = config.paths.cache_dir.parent / "models"
             models_dir.mkdir(parents=True, exist_ok=True)
-            model = WhisperModel(model_size, device="auto", compute_type="int8", download_root=str(models_dir))
-            transcriber = WhisperTranscriber(model=model, language=language)
+            model = faster_whisper_module().BatchedInferencePipeline(
+                model=get_whisper_model(model_size, device, compute_type, models_dir)
+            )
+            workers = parallel_workers(replica_options(device))
+            transcriber = WhisperTranscriber(
+                model=model,
+                language=language,
+                batch_size=config.batch_size,
+                workers=workers,
+                skip_silence=True,
+                model_name=f"{model_size}/{compute_type}",
+            )
         else:
+            workers = 1
             transcriber = _DummyTranscriber()
 
+        entries: queue.Queue = queue.Queue()
         pipeline = ProcessingPipeline(
-            options=PipelineOptions(dry_run=dry_run, output_path=config.paths.output_path),
-            filter_config=FilterConfig(
-                allowed_sender_ids=sender_ids or None,
-                allowed_types=set(MessageType(t) for t in message_types),
-                year=None,
-                include_self=include_self,
+            options=PipelineOptions(
+                dry_run=dry_run,
+                output_path=config.paths.output_path,
+                transcribe_concurrency=workers,
+                transcribe_batch=config.group_size,
+                pre_filtered=True,
             ),
+            filter_config=message_filter,
             exporter=exporter,
             dry_run_report=dry_run_report,
             downloader=downloader,
@@ -435,11 +518,23 @@ def process_transcription(
             writer=FileWriter(),
             state=state,
             self_user_id=collection.self_user_id,
+            on_entry=entries.put,
+            transcript_cache=None if dry_run else TranscriptCache(
+                config.paths.transcript_cache_path,
+                namespace=transcriber.cache_namespace(),
+            ),
         )
 
-        # Run pipeline
+        # Run pipeline, streaming transcripts into the status panel as they arrive
         st.write("⚙️ Processing messages...")
-        result = run_async(pipeline.run(collection.messages))
+        future = submit_async(pipeline.run(pending))
+        if not dry_run:
+            st.write_stream(_stream_entries(entries, future))
+        try:
+            result = future.result()
+        finally:
+            # Only once the run is over; an interrupted stream leaves it running.
+            pipeline.close()
 
         if dry_run:
             status.update(label="Dry run complete!", state="complete")
@@ -451,12 +546,44 @@ def process_transcription(
             st.write(f"Processed {result.processed_messages} messages")
             logger.info("Transcription complete | processed=%s chat=%s", result.processed_messages, chat_name)
 
-            # Load result for download
+            # Keep only the path; the file is read on demand when rendering results
             if result.output_path and result.output_path.exists():
-                st.session_state.result_markdown = result.output_path.read_text()
+                st.session_state.result_path = result.output_path
+                st.session_state.result_preview = _read_preview(result.output_path)
                 logger.info("Markdown ready at %s", result.output_path)
 
 
+async def _collect_with_state(
+    collector: TelegramCollector,
+    *,
+    chat_id: int,
+    message_filter: FilterConfig,
+    config: AppConfig,
+) -> tuple[CollectionResult, StateStore]:
+    """Collect messages and load the resume state concurrently in one loop round-trip."""
+    collection, state = await asyncio.gather(
+        collector.collect(
+            chat_identifier=chat_id,
+            filter_config=message_filter,
+            since=config.date_range.since,
+            until=config.date_range.until,
+        ),
+        asyncio.to_thread(open_state, config.paths.state_path, config.state_backend),
+    )
+    return collection, state
+
+
+def _stream_entries(entries: queue.Queue, future):
+    """Yield transcript lines from the pipeline until it finishes."""
+    while not (future.done() and entries.empty()):
+        try:
+            entry = entries.get(timeout=0.2)
+        except queue.Empty:
+            continue
+        time_str = entry.timestamp.strftime("%Y-%m-%d %H:%M")
+        yield f"{time_str} – {entry.sender_display}: {entry.content}\n\n"
+
+
 class _DummyTranscriber:
     def transcribe(self, audio_path):
         return "[Dry run - no transcription]"
@@ -481,6 +608,16 @@ def _setup_logging() -> None:
     st.session_state.logging_configured = True
 
 
+def _read_preview(path: Path, max_bytes: int = 5000) -> str:
+    """Decode only the head of a (possibly large) markdown file."""
+    with path.open("rb") as handle:
+        data = handle.read(max_bytes + 1)
+    truncated = len(data) > max_bytes
+    # "ignore" drops a multi-byte character cut in half at the boundary.
+    text = data[:max_bytes].decode("utf-8", errors="ignore")
+    return text + "..." if truncated else text
+
+
 def _read_log_tail(path: Path, max_bytes: int = 8000) -> str:
     try:
         data = path.read_bytes()
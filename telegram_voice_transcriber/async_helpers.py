@@ -3,47 +3,70 @@ from __future__ import annotations
 
 import asyncio
 import threading
-from concurrent.futures import ThreadPoolExecutor
-from typing import TypeVar
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Coroutine, TypeVar
 
 T = TypeVar("T")
 
 # Persistent event loop for Telethon - must stay the same after connection
 _loop: asyncio.AbstractEventLoop | None = None
 _loop_thread: threading.Thread | None = None
+_loop_lock = threading.Lock()
+# Runs nested calls made from inside a running loop; created on first use and
+# reused. Every nesting level in progress holds one worker, hence the headroom.
+_nested_pool: ThreadPoolExecutor | None = None
 
 
 def _get_or_create_loop() -> asyncio.AbstractEventLoop:
     """Get or create the persistent event loop running in a background thread."""
     global _loop, _loop_thread
 
-    if _loop is None or not _loop.is_running():
-        _loop = asyncio.new_event_loop()
+    with _loop_lock:
+        if _loop is None or _loop_thread is None or not _loop_thread.is_alive():
+            loop = asyncio.new_event_loop()
+            started = threading.Event()
 
-        def run_loop():
-            asyncio.set_event_loop(_loop)
-            _loop.run_forever()
+            def run_loop():
+                asyncio.set_event_loop(loop)
+                loop.call_soon(started.set)
+                loop.run_forever()
 
-        _loop_thread = threading.Thread(target=run_loop, daemon=True)
-        _loop_thread.start()
+            _loop = loop
+            _loop_thread = threading.Thread(target=run_loop, name="run_async-loop", daemon=True)
+            _loop_thread.start()
+            started.wait()
 
     return _loop
 
 
-def run_async(coro: asyncio.coroutines) -> T:
+def submit_async(coro: Coroutine[Any, Any, T]) -> Future[T]:
+    """Schedule a coroutine on the persistent event loop without waiting for it."""
+    return asyncio.run_coroutine_threadsafe(coro, _get_or_create_loop())
+
+
+def _get_nested_pool() -> ThreadPoolExecutor:
+    global _nested_pool
+
+    with _loop_lock:
+        if _nested_pool is None:
+            _nested_pool = ThreadPoolExecutor(
+                max_workers=16, thread_name_prefix="run_async-nested"
+            )
+    return _nested_pool
+
+
+def run_async(coro: Coroutine[Any, Any, T]) -> T:
     """Run an async coroutine using the persistent event loop."""
     loop = _get_or_create_loop()
 
-    # If already inside any running loop (including our own), offload to a fresh loop
-    # in a worker thread to avoid deadlocks and RuntimeError from asyncio.run().
+    # Blocking inside a running loop would deadlock (ours may be waiting on this
+    # very call further up), so nested calls from any thread that runs a loop
+    # get a fresh loop in a worker thread instead.
     try:
-        running = asyncio.get_running_loop()
+        asyncio.get_running_loop()
     except RuntimeError:
-        running = None
-
-    if running is not None:
-        with ThreadPoolExecutor(max_workers=1) as pool:
-            return pool.submit(asyncio.run, coro).result()
+        pass
+    else:
+        return _get_nested_pool().submit(asyncio.run, coro).result()
 
-    future = asyncio.run_coroutine_threadsafe(coro, loop)
-    return future.result()
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
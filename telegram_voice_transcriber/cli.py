@@ -20,12 +20,18 @@ from .config import AppConfig, build_app_config, compute_date_range
 from .download import MediaDownloader
 from .dry_run import DryRunReport
 from .export_md import MarkdownExporter
-from .filters import FilterConfig, MessageType
+from .filters import AUDIO_TYPES, FilterConfig
 from .models import MessageEnvelope
 from .pipeline import PipelineOptions, ProcessingPipeline, ProcessingSummary
-from .state import ProcessingState
+from .state import StateStore, TranscriptCache, open_state
 from .tg_client import TelegramCollector, CollectionResult
-from .transcribe import WhisperTranscriber
+from .transcribe import (
+    WhisperTranscriber,
+    faster_whisper_module,
+    parallel_workers,
+    replica_options,
+    select_compute_type,
+)
 from .writer import FileWriter
 
 app = typer.Typer(add_completion=False, help="Transkribiert Telegram-Sprachnachrichten in Markdown.")
@@ -100,6 +106,53 @@ def run(
         "--model",
         help="Whisper-Modellgröße (z. B. tiny, base, small, medium).",
     ),
+    batch_size: int = typer.Option(
+        16,
+        "--batch-size",
+        min=1,
+        help="Audio-Segmente pro Whisper-Durchlauf (kleiner wählen bei Speicherproblemen).",
+    ),
+    group_size: int = typer.Option(
+        16,
+        "--group-size",
+        min=1,
+        help=(
+            "Sprachnachrichten, die gemeinsam heruntergeladen und transkribiert werden "
+            "(bestimmt, wie viele Audiodateien gleichzeitig im Cache liegen)."
+        ),
+    ),
+    beam_size: int = typer.Option(
+        1,
+        "--beam-size",
+        min=1,
+        help="Beam-Search-Breite für Whisper (1 = schnelle Greedy-Dekodierung).",
+    ),
+    device: Optional[str] = typer.Option(
+        None,
+        "--device",
+        help="Rechengerät für Whisper (cpu oder cuda). Standard: automatisch erkennen.",
+    ),
+    compute_type: Optional[str] = typer.Option(
+        None,
+        "--compute-type",
+        help="Whisper-Genauigkeit (z. B. int8, int8_float16, float16). Standard: passend zum Gerät.",
+    ),
+    workers: Optional[int] = typer.Option(
+        None,
+        "--workers",
+        min=1,
+        help="Parallele Transkriptionen pro Gerät (mehr Durchsatz, mehr Speicher). Standard: automatisch.",
+    ),
+    state_backend: str = typer.Option(
+        "exact",
+        "--state-backend",
+        help="Speicher für bereits verarbeitete Nachrichten: exact (letzte 2000) oder bloom (alle, mit seltenen Fehltreffern).",
+    ),
+    events_path: Optional[Path] = typer.Option(
+        None,
+        "--events",
+        help="Fortschritt als JSON Lines in diese Datei schreiben (ein Ereignis pro Nachricht).",
+    ),
     verbose: bool = typer.Option(
         False,
         "--verbose/--no-verbose",
@@ -128,6 +181,14 @@ def run(
         base_dir=data_dir,
         since_date=since_date,
         until_date=until_date,
+        batch_size=batch_size,
+        group_size=group_size,
+        beam_size=beam_size,
+        device=device,
+        compute_type=compute_type,
+        workers=workers,
+        state_backend=state_backend,
+        events_path=events_path,
     )
 
     if verbose:
@@ -177,7 +238,7 @@ async def run_app(config: AppConfig, console: Console, *, count: Optional[int] =
             console.print("[yellow]Keine Nachrichten im angegebenen Zeitraum gefunden.[/]")
             return
 
-        state = ProcessingState(config.paths.state_path)
+        state = open_state(config.paths.state_path, config.state_backend)
         downloader = MediaDownloader(client=client, base_dir=config.paths.cache_dir)
 
         exporter = MarkdownExporter(
@@ -189,11 +250,15 @@ async def run_app(config: AppConfig, console: Console, *, count: Optional[int] =
         dry_run_report = DryRunReport(chat_title=collection.chat_title, year=config.year)
 
         allowed_sender_ids = determine_sender_ids(collection, config)
+        transcriber = create_transcriber(config, state, collection.messages, console)
 
         pipeline = ProcessingPipeline(
             options=PipelineOptions(
                 dry_run=config.dry_run,
                 output_path=config.paths.output_path,
+                transcribe_concurrency=transcriber.workers,
+                transcribe_batch=config.group_size,
+                events_path=config.events_path,
             ),
             filter_config=FilterConfig(
                 allowed_sender_ids=allowed_sender_ids,
@@ -204,10 +269,14 @@ async def run_app(config: AppConfig, console: Console, *, count: Optional[int] =
             exporter=exporter,
             dry_run_report=dry_run_report,
             downloader=downloader,
-            transcriber=create_transcriber(config, state, collection.messages, console),
+            transcriber=transcriber,
             writer=FileWriter(),
             state=state,
             self_user_id=collection.self_user_id,
+            transcript_cache=None if config.dry_run else TranscriptCache(
+                config.paths.transcript_cache_path,
+                namespace=transcriber.cache_namespace(),
+            ),
         )
 
         messages = _limit_messages(collection.messages, count)
@@ -216,7 +285,10 @@ async def run_app(config: AppConfig, console: Console, *, count: Optional[int] =
                 f"[yellow]Debug-Modus:[/] Verarbeite nur die letzten {min(count, len(collection.messages))} Nachrichten."
             )
 
-        result = await pipeline.run(messages)
+        try:
+            result = await pipeline.run(messages)
+        finally:
+            pipeline.close()
         if config.dry_run:
             print_dry_run(console, result)
         else:
@@ -231,9 +303,7 @@ def _limit_messages(messages: Iterable[MessageEnvelope], count: Optional[int]) -
 
 
 def determine_sender_ids(collection: CollectionResult, config: AppConfig) -> Optional[set[int]]:
-    sender_ids = {
-        message.sender_id for message in collection.messages if message.sender_id is not None
-    }
+    sender_ids = set(collection.sender_ids)
     if collection.self_user_id is not None and not config.include_self:
         sender_ids.discard(collection.self_user_id)
     if not sender_ids:
@@ -243,7 +313,7 @@ def determine_sender_ids(collection: CollectionResult, config: AppConfig) -> Opt
 
 def create_transcriber(
     config: AppConfig,
-    state: ProcessingState,
+    state: StateStore,
     messages,
     console: Console,
 ) -> WhisperTranscriber:
@@ -254,36 +324,43 @@ def create_transcriber(
 
     console.print("[cyan]Lade Whisper-Modell[/] "
                   f"[magenta]{config.model_size}[/] …")
-    from faster_whisper import WhisperModel  # imported lazily
-
     models_dir = config.paths.cache_dir.parent / "models"
     models_dir.mkdir(parents=True, exist_ok=True)
-    model = WhisperModel(
+    device, compute_type = select_compute_type(config.device)
+    compute_type = config.compute_type or compute_type
+    console.print(f"[cyan]Whisper läuft auf[/] [magenta]{device}[/] ([magenta]{compute_type}[/])")
+    replicas = replica_options(device, config.workers)
+    faster_whisper = faster_whisper_module()
+    model = faster_whisper.WhisperModel(
         config.model_size,
-        device="auto",
-        compute_type="int8",
+        device=device,
+        compute_type=compute_type,
         download_root=str(models_dir),
+        **replicas,
+    )
+    return WhisperTranscriber(
+        model=faster_whisper.BatchedInferencePipeline(model=model),
+        language=config.language,
+        beam_size=config.beam_size,
+        batch_size=config.batch_size,
+        workers=parallel_workers(replicas),
+        skip_silence=True,
+        model_name=f"{config.model_size}/{compute_type}",
     )
-    return WhisperTranscriber(model=model, language=config.language)
 
 
 def requires_transcription(
     config: AppConfig,
-    state: ProcessingState,
+    state: StateStore,
     messages,
 ) -> bool:
     if config.dry_run:
         return False
-    for message in messages:
-        if state.has_processed(message.message_id):
-            continue
-        if message.message_type in {
-            MessageType.VOICE,
-            MessageType.AUDIO,
-            MessageType.VIDEO_NOTE,
-        }:
-            return True
-    return False
+    processed = state.processed_ids
+    return any(
+        message.message_type in AUDIO_TYPES and message.message_id not in processed
+        for message in messages
+    )
 
 
 def print_dry_run(console: Console, stats) -> None:
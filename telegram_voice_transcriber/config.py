@@ -6,7 +6,8 @@ from datetime import datetime, timezone
 from pathlib import Path
 from typing import Iterable, Set
 
-from .filters import MessageType
+from .filters import MessageType, message_type_from_value, year_bounds
+from .state import STATE_BACKENDS
 
 
 @dataclass(slots=True)
@@ -14,6 +15,8 @@ class PathConfig:
     cache_dir: Path
     output_path: Path
     state_path: Path
+    # Shared by all chats, since forwarded recordings cross chats.
+    transcript_cache_path: Path
 
 
 @dataclass(slots=True)
@@ -39,11 +42,29 @@ class AppConfig:
     session_file: Path
     paths: PathConfig
     date_range: DateRange
+    batch_size: int = 16
+    # Voice messages transcribed (and kept downloaded) together per pipeline group;
+    # independent of batch_size, which only sizes Whisper's forward passes.
+    group_size: int = 16
+    beam_size: int = 1
+    # None lets the transcriber pick from the available hardware.
+    device: str | None = None
+    # Whisper weight precision; by default int8 (int8_float16 on CUDA), which
+    # trades a barely measurable accuracy loss for about half the memory and time.
+    compute_type: str | None = None
+    # Model replicas per device, i.e. messages transcribed in parallel on each.
+    workers: int | None = None
+    # "exact" keeps the last IDs; "bloom" remembers all of them approximately.
+    state_backend: str = "exact"
+    # Optional JSON Lines progress log, see PipelineOptions.events_path.
+    events_path: Path | None = None
+
+
+_NON_SLUG_CHARS = re.compile(r"[^a-z0-9]+")
 
 
 def slugify_chat_name(name: str) -> str:
-    lowered = name.lower()
-    lowered = re.sub(r"[^a-z0-9]+", "-", lowered)
+    lowered = _NON_SLUG_CHARS.sub("-", name.lower())
     return lowered.strip("-") or "chat"
 
 
@@ -51,7 +72,7 @@ def parse_message_types(values: Iterable[str]) -> Set[MessageType]:
     types = set()
     for value in values:
         try:
-            types.add(MessageType(value))
+            types.add(message_type_from_value(value))
         except ValueError as exc:
             raise ValueError(f"Unbekannter Nachrichtentyp: {value}") from exc
     return types
@@ -67,12 +88,12 @@ def compute_paths(base_dir: Path, chat_slug: str, year: int) -> PathConfig:
         cache_dir=cache_dir,
         output_path=output_path,
         state_path=state_path,
+        transcript_cache_path=base_dir / "transcript_cache.json",
     )
 
 
 def compute_date_range(year: int) -> DateRange:
-    since = datetime(year, 1, 1, 0, 0, 0, tzinfo=timezone.utc)
-    until = datetime(year + 1, 1, 1, 0, 0, 0, tzinfo=timezone.utc)
+    since, until = year_bounds(year)
     return DateRange(since=since, until=until)
 
 
@@ -93,7 +114,17 @@ def build_app_config(
     base_dir: Path,
     since_date: str | None = None,
     until_date: str | None = None,
+    batch_size: int = 16,
+    group_size: int = 16,
+    beam_size: int = 1,
+    device: str | None = None,
+    compute_type: str | None = None,
+    workers: int | None = None,
+    state_backend: str = "exact",
+    events_path: Path | None = None,
 ) -> AppConfig:
+    if state_backend not in STATE_BACKENDS:
+        raise ValueError(f"Unbekanntes State-Backend: {state_backend}")
     chat_slug = slugify_chat_name(chat_identifier)
     types = parse_message_types(include_types)
     paths = compute_paths(base_dir, chat_slug, year)
@@ -115,6 +146,14 @@ def build_app_config(
         session_file=session_file,
         paths=paths,
         date_range=date_range,
+        batch_size=batch_size,
+        group_size=group_size,
+        beam_size=beam_size,
+        device=device,
+        compute_type=compute_type,
+        workers=workers,
+        state_backend=state_backend,
+        events_path=events_path,
     )
 
 
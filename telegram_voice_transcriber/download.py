@@ -46,30 +46,33 @@ class MediaDownloader:
         return target_path
 
 
+_EXTENSIONS_BY_MIME = {
+    "audio/ogg": ".ogg",
+    "audio/mpeg": ".mp3",
+    "video/mp4": ".mp4",
+}
+
+_DEFAULT_EXTENSIONS = {
+    MessageType.VOICE: ".ogg",
+    MessageType.AUDIO: ".mp3",
+    MessageType.VIDEO_NOTE: ".mp4",
+}
+
+
 def _infer_extension(message: MessageEnvelope) -> str:
     raw = message.raw_message
-    extensions = [
-        getattr(getattr(raw, "file", None), "ext", None),
-        getattr(getattr(raw, "document", None), "ext", None),
-    ]
-    for ext in extensions:
-        if ext:
-            return ext if ext.startswith(".") else f".{ext}"
-
-    mime = getattr(getattr(raw, "file", None), "mime_type", None)
-    if mime == "audio/ogg":
-        return ".ogg"
-    if mime == "audio/mpeg":
-        return ".mp3"
-    if mime == "video/mp4":
-        return ".mp4"
-
-    defaults = {
-        MessageType.VOICE: ".ogg",
-        MessageType.AUDIO: ".mp3",
-        MessageType.VIDEO_NOTE: ".mp4",
-    }
-    return defaults.get(message.message_type, ".bin")
+    file = getattr(raw, "file", None)
+    ext = getattr(file, "ext", None) or getattr(
+        getattr(raw, "document", None), "ext", None
+    )
+    if ext:
+        return ext if ext.startswith(".") else f".{ext}"
+
+    mime_ext = _EXTENSIONS_BY_MIME.get(getattr(file, "mime_type", None))
+    if mime_ext is not None:
+        return mime_ext
+
+    return _DEFAULT_EXTENSIONS.get(message.message_type, ".bin")
 
 
 def _ensure_timestamp(date: Optional[datetime]) -> datetime:
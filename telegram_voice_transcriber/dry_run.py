@@ -8,7 +8,7 @@ from .filters import MessageType
 from .models import DryRunStats, MessageSummary
 
 
-@dataclass
+@dataclass(slots=True)
 class DryRunReport:
     chat_title: str
     year: int
@@ -22,7 +22,9 @@ class DryRunReport:
     def add(self, summary: MessageSummary) -> None:
         self._total += 1
         self._type_counter[summary.message_type] += 1
-        if len(self._examples) < self.sample_size:
+        # Keep the earliest messages as examples; the running total already tells
+        # us when the sample is full.
+        if self._total <= self.sample_size:
             self._examples.append(summary)
 
     def finalise(self) -> DryRunStats:
@@ -31,5 +33,5 @@ class DryRunReport:
             year=self.year,
             total_messages=self._total,
             type_counts=dict(self._type_counter),
-            example_messages=self._examples,
+            example_messages=list(self._examples),
         )
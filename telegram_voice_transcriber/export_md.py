@@ -1,9 +1,11 @@
 from __future__ import annotations
 
-from collections import defaultdict
-from dataclasses import dataclass
-from datetime import datetime
-from typing import Iterable, List
+import functools
+import io
+from dataclasses import dataclass, field
+from datetime import datetime, timezone, tzinfo
+from typing import Iterable, Iterator, List, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 from dateutil.tz import gettz
 
@@ -17,47 +19,85 @@ class MarkdownExporter:
     year: int
     include_message_ids: bool
     timezone_name: str
+    _tzinfo: Optional[tzinfo] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        self._tzinfo = _resolve_timezone(self.timezone_name)
 
     def render(self, entries: Iterable[TranscriptEntry]) -> str:
-        tzinfo = gettz(self.timezone_name)
-        sorted_entries = sorted(entries, key=lambda item: item.timestamp)
+        buffer = io.StringIO()
+        buffer.writelines(self.iter_lines(entries))
+        return buffer.getvalue().rstrip() + "\n"
 
-        grouped: dict[str, List[TranscriptEntry]] = defaultdict(list)
-        for entry in sorted_entries:
-            localized = entry.timestamp.astimezone(tzinfo)
+    def iter_lines(self, entries: Iterable[TranscriptEntry]) -> Iterator[str]:
+        """Yield the document line by line, each terminated with a newline."""
+        # Group by local day in a single pass and only sort within each day;
+        # the localized timestamp travels alongside the entry instead of a copy.
+        grouped: dict[str, List[tuple[datetime, TranscriptEntry]]] = {}
+        for entry in entries:
+            localized = self._localize(entry.timestamp)
             date_key = localized.strftime("%Y-%m-%d")
-            grouped[date_key].append(
-                TranscriptEntry(
-                    message_id=entry.message_id,
-                    timestamp=localized,
-                    sender_display=entry.sender_display,
-                    message_type=entry.message_type,
-                    content=entry.content,
-                )
-            )
-
-        lines: List[str] = [f"# Transkript – {self.chat_title} ({self.year})"]
-
-        for date_key in sorted(grouped.keys()):
-            lines.append("")
-            lines.append(f"## {date_key}")
-            for entry in grouped[date_key]:
-                time_str = entry.timestamp.strftime("%H:%M")
-                suffix = self._type_suffix(entry.message_type)
-                content = entry.content.strip()
-                id_suffix = (
-                    f" [#ID: {entry.message_id}]"
-                    if self.include_message_ids
-                    else ""
-                )
-                lines.append(
-                    f"{time_str} – {entry.sender_display}: {content}{suffix}{id_suffix}"
-                )
-
-        return "\n".join(lines).strip() + "\n"
+            grouped.setdefault(date_key, []).append((localized, entry))
+
+        yield self.render_header()
+
+        for date_key in sorted(grouped):
+            day = grouped[date_key]
+            day.sort(key=lambda item: item[0])
+            yield f"\n## {date_key}\n"
+            for localized, entry in day:
+                yield self._entry_line(localized, entry)
+
+    def render_header(self) -> str:
+        return f"# Transkript – {self.chat_title} ({self.year})\n"
+
+    def render_entry(
+        self, entry: TranscriptEntry, current_day: Optional[str] = None
+    ) -> tuple[str, str]:
+        """Render one entry of a chronological stream.
+
+        Returns the entry's local day and its line, preceded by the day heading
+        when that day differs from ``current_day`` (the day of the previous entry).
+        """
+        localized = self._localize(entry.timestamp)
+        date_key = localized.strftime("%Y-%m-%d")
+        line = self._entry_line(localized, entry)
+        if date_key != current_day:
+            line = f"\n## {date_key}\n{line}"
+        return date_key, line
+
+    def _localize(self, timestamp: datetime) -> datetime:
+        # Telegram timestamps are UTC, so UTC exports need no conversion at all.
+        if timestamp.tzinfo is self._tzinfo:
+            return timestamp
+        return timestamp.astimezone(self._tzinfo)
+
+    def _entry_line(self, localized: datetime, entry: TranscriptEntry) -> str:
+        return (
+            f"{localized.strftime('%H:%M')} – {entry.sender_display}: "
+            f"{entry.content.strip()}{self._type_suffix(entry.message_type)}"
+            f"{self._id_suffix(entry.message_id)}\n"
+        )
+
+    def _id_suffix(self, message_id: int) -> str:
+        if not self.include_message_ids:
+            return ""
+        return f" [#ID: {message_id}]"
 
     @staticmethod
     def _type_suffix(message_type: MessageType) -> str:
         if message_type is MessageType.TEXT:
             return ""
         return f" ({message_type.value})"
+
+
+@functools.lru_cache(maxsize=32)
+def _resolve_timezone(name: str) -> Optional[tzinfo]:
+    # zoneinfo is implemented in C and converts faster; dateutil still covers
+    # names and POSIX TZ strings the system tz database does not know.
+    if name.upper() in ("UTC", "ETC/UTC"):
+        return timezone.utc
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return gettz(name)
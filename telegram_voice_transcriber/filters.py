@@ -1,9 +1,10 @@
 from __future__ import annotations
 
+import functools
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import datetime, timezone
 from enum import Enum
-from typing import Iterable, Optional, Protocol
+from typing import AbstractSet, Iterable, Optional, Protocol
 
 
 class MessageLike(Protocol):
@@ -24,31 +25,50 @@ class MessageType(str, Enum):
     OTHER = "other"
 
 
-@dataclass(frozen=True)
+_MESSAGE_TYPES_BY_VALUE = {message_type.value: message_type for message_type in MessageType}
+
+
+def message_type_from_value(value: str) -> MessageType:
+    """Resolve a type string such as ``"voice"`` with a plain dict lookup."""
+    try:
+        return _MESSAGE_TYPES_BY_VALUE[value]
+    except KeyError:
+        raise ValueError(f"{value!r} is not a valid MessageType") from None
+
+
+# Message types whose media has to be downloaded and transcribed.
+AUDIO_TYPES = frozenset({MessageType.VOICE, MessageType.AUDIO, MessageType.VIDEO_NOTE})
+
+
+@dataclass(frozen=True, slots=True)
 class FilterConfig:
     allowed_sender_ids: Optional[set[int]]
-    allowed_types: set[MessageType]
+    allowed_types: AbstractSet[MessageType]
     year: Optional[int]
     include_self: bool
 
 
-def determine_message_type(message: object) -> MessageType:
-    """Infer message type using a subset of Telethon attributes."""
-    # Voice notes expose `voice=True`.
-    voice_flag = getattr(message, "voice", False)
-    if voice_flag:
-        return MessageType.VOICE
+# Media flags probed in order of precedence; Telethon exposes these as
+# properties, so they have to be read with getattr rather than via __dict__.
+_TYPE_PROBES = (
+    ("voice", MessageType.VOICE),
+    ("video_note", MessageType.VIDEO_NOTE),
+    ("audio", MessageType.AUDIO),
+)
 
-    # Video notes are `video_note` or round videos (document attribute).
-    if getattr(message, "video", None) and getattr(message, "round", False):
-        return MessageType.VIDEO_NOTE
 
-    if getattr(message, "video_note", False):
+def determine_message_type(message: object) -> MessageType:
+    """Infer message type using a subset of Telethon attributes."""
+    # Round videos (document attribute) count as video notes; a voice flag
+    # still wins over them.
+    if getattr(message, "round", False) and getattr(message, "video", None):
+        if getattr(message, "voice", False):
+            return MessageType.VOICE
         return MessageType.VIDEO_NOTE
 
-    # Plain audio files.
-    if getattr(message, "audio", None):
-        return MessageType.AUDIO
+    for attribute, message_type in _TYPE_PROBES:
+        if getattr(message, attribute, None):
+            return message_type
 
     if getattr(message, "message", None):
         return MessageType.TEXT
@@ -79,8 +99,56 @@ def should_include_message(
     return message.sender_id in config.allowed_sender_ids
 
 
+def filter_messages(
+    messages: Iterable["MessageEnvelope"],
+    config: FilterConfig,
+    *,
+    self_user_id: Optional[int],
+) -> list["MessageEnvelope"]:
+    """Apply `should_include_message` to a whole batch of messages.
+
+    The config fields are read once up front instead of once per message.
+    """
+    allowed_types = config.allowed_types
+    year = config.year
+    start, end = year_bounds(year) if year is not None else (None, None)
+    allowed_sender_ids = config.allowed_sender_ids
+    include_self = config.include_self
+
+    # The sender check is inlined rather than a helper call: this comprehension
+    # runs once per message in the chat.
+    return [
+        message
+        for message in messages
+        if message.message_type in allowed_types
+        and (year is None or start <= _assume_utc(message.date) < end)
+        and (
+            include_self
+            if message.sender_id == self_user_id
+            else allowed_sender_ids is None or message.sender_id in allowed_sender_ids
+        )
+    ]
+
+
+@functools.lru_cache(maxsize=8)
+def year_bounds(year: int) -> tuple[datetime, datetime]:
+    """Start (inclusive) and end (exclusive) of a calendar year in UTC."""
+    return (
+        datetime(year, 1, 1, tzinfo=timezone.utc),
+        datetime(year + 1, 1, 1, tzinfo=timezone.utc),
+    )
+
+
 def within_year(timestamp: datetime, year: int) -> bool:
-    return timestamp.year == year
+    start, end = year_bounds(year)
+    return start <= _assume_utc(timestamp) < end
+
+
+def _assume_utc(timestamp: datetime) -> datetime:
+    # The collector hands out aware UTC dates; naive ones are read as UTC.
+    if timestamp.tzinfo is None:
+        return timestamp.replace(tzinfo=timezone.utc)
+    return timestamp
 
 
 # Circular imports guard (MessageEnvelope defined in models.py)
@@ -17,10 +17,11 @@ class MessageEnvelope:
     date: datetime
     message_type: MessageType
     text: str | None = None
+    # Original Telethon message, kept only for media that still has to be downloaded.
     raw_message: Any | None = None
 
 
-@dataclass(slots=True)
+@dataclass(frozen=True, slots=True)
 class TranscriptEntry:
     """A single line (text or transcribed audio) going into the Markdown export."""
 
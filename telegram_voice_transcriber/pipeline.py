@@ -1,18 +1,38 @@
 from __future__ import annotations
 
-from collections import Counter
-from dataclasses import dataclass
+import asyncio
+import json
+import time
+from collections import Counter, deque
+from contextlib import ExitStack
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import dataclass, field
 import logging
 from pathlib import Path
-from typing import Iterable, Optional, Protocol
+from typing import (
+    Any,
+    Callable,
+    ContextManager,
+    Iterable,
+    Optional,
+    Protocol,
+    TextIO,
+    TypeVar,
+    cast,
+)
 
 logger = logging.getLogger(__name__)
 
 from .dry_run import DryRunReport
 from .export_md import MarkdownExporter
-from .filters import FilterConfig, MessageType, should_include_message
+from .filters import AUDIO_TYPES, FilterConfig, MessageType, filter_messages
 from .models import MessageEnvelope, MessageSummary, TranscriptEntry
-from .state import ProcessingState
+from .state import StateStore, TranscriptCache, file_digest
+
+T = TypeVar("T")
+
+_EMPTY_TRANSCRIPTION = "[Leere Transkription]"
+_FAILED_TRANSCRIPTION = "[Transkription fehlgeschlagen]"
 
 
 class Downloader(Protocol):
@@ -25,8 +45,14 @@ class Transcriber(Protocol):
         ...
 
 
+class BatchTranscriber(Transcriber, Protocol):
+    def transcribe_batch(self, audio_paths: list[Path]) -> list[str]:
+        ...
+
+
 class Writer(Protocol):
-    def write(self, target: Path, content: str) -> None:
+    def open(self, target: Path) -> ContextManager[TextIO]:
+        """Open ``target`` for incremental writing, committed when the block exits."""
         ...
 
 
@@ -34,6 +60,31 @@ class Writer(Protocol):
 class PipelineOptions:
     dry_run: bool
     output_path: Path
+    # Maximum number of media downloads in flight at once.
+    download_concurrency: int = 8
+    # How many media messages may be downloaded ahead of transcription; by
+    # default one group per transcription worker plus the next group, and at
+    # least enough to keep every download slot busy.
+    prefetch: Optional[int] = None
+    # Messages transcribed at once; match the transcriber's model replicas.
+    transcribe_concurrency: int = 1
+    # Audio messages handed to `transcribe_batch` in one call; needs a
+    # BatchTranscriber when greater than one.
+    transcribe_batch: int = 1
+    # Set when the collector already applied `filter_config` to the messages.
+    pre_filtered: bool = False
+    # JSON Lines file receiving a progress event per finished message (full run
+    # only), so other processes can follow a run by tailing it.
+    events_path: Optional[Path] = None
+
+    @property
+    def prefetch_depth(self) -> int:
+        if self.prefetch is not None:
+            return self.prefetch
+        return max(
+            self.download_concurrency,
+            (self.transcribe_concurrency + 1) * self.transcribe_batch,
+        )
 
 
 @dataclass(slots=True)
@@ -52,8 +103,29 @@ class ProcessingPipeline:
     downloader: Downloader
     transcriber: Transcriber
     writer: Writer
-    state: ProcessingState
+    state: StateStore
     self_user_id: Optional[int] = None
+    # Called with each transcript entry as soon as it is produced (full run only).
+    on_entry: Optional[Callable[[TranscriptEntry], None]] = None
+    # Reuses transcripts of byte-identical recordings, e.g. forwarded voice notes.
+    transcript_cache: Optional[TranscriptCache] = None
+    # Threads for blocking Whisper calls, sized to `transcribe_concurrency` so the
+    # model is not oversubscribed the way the loop's default executor would be.
+    _executor: Optional[ThreadPoolExecutor] = field(init=False, default=None, repr=False)
+
+    def close(self) -> None:
+        """Release the transcription threads; the pipeline can still be rerun."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _transcription_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=max(1, self.options.transcribe_concurrency),
+                thread_name_prefix="transcribe",
+            )
+        return self._executor
 
     async def run(self, messages: Iterable[MessageEnvelope]):
         if self.options.dry_run:
@@ -61,19 +133,16 @@ class ProcessingPipeline:
         return await self._run_full(messages)
 
     async def _run_dry(self, messages: Iterable[MessageEnvelope]):
-        for message in messages:
-            if self.state.has_processed(message.message_id):
-                continue
-            if not should_include_message(
-                message, self.filter_config, self_user_id=self.self_user_id
-            ):
-                continue
-            logger.info(
-                "Processing %s %s #%s (dry-run)",
-                message.date.strftime("%Y-%m-%d %H:%M"),
-                message.message_type.name,
-                message.message_id,
-            )
+        # Checked once so the per-message strftime is skipped when INFO is off.
+        log_progress = logger.isEnabledFor(logging.INFO)
+        for message in self._select(messages):
+            if log_progress:
+                logger.info(
+                    "Processing %s %s #%s (dry-run)",
+                    message.date.strftime("%Y-%m-%d %H:%M"),
+                    message.message_type.name,
+                    message.message_id,
+                )
             summary = MessageSummary(
                 message_id=message.message_id,
                 timestamp=message.date,
@@ -84,70 +153,265 @@ class ProcessingPipeline:
         return self.dry_run_report.finalise()
 
     async def _run_full(self, messages: Iterable[MessageEnvelope]):
-        transcript_entries: list[TranscriptEntry] = []
         counts: Counter[MessageType] = Counter()
 
-        for message in messages:
-            if self.state.has_processed(message.message_id):
-                continue
-
-            if not should_include_message(
-                message, self.filter_config, self_user_id=self.self_user_id
-            ):
-                continue
-
-            logger.info(
-                "Processing %s %s #%s",
-                message.date.strftime("%Y-%m-%d %H:%M"),
-                message.message_type.name,
-                message.message_id,
+        included = self._select(messages)
+
+        # Producer/consumer: a background task starts downloads in message order
+        # (at most `download_concurrency` in flight) and hands them over through a
+        # queue. `window` caps how many downloads may be started ahead of the
+        # consumer below, which transcribes while the producer keeps fetching.
+        downloads: asyncio.Queue[asyncio.Task[Path]] = asyncio.Queue()
+        window = asyncio.Semaphore(max(1, self.options.prefetch_depth))
+        producer = asyncio.create_task(
+            self._produce_downloads(
+                [m for m in included if m.message_type in AUDIO_TYPES],
+                downloads,
+                window,
             )
-            entry = await self._process_message(message)
-            if entry is None:
-                continue
-            transcript_entries.append(entry)
-            self.state.record_processed(message.message_id)
-            counts[entry.message_type] += 1
+        )
+
+        # Messages are processed in groups holding up to `transcribe_batch` audio
+        # messages (plus the text messages between them). Up to
+        # `transcribe_concurrency` groups run at once; results are collected
+        # oldest-first so the transcript keeps chronological order.
+        processing: deque[asyncio.Task[list[Optional[TranscriptEntry]]]] = deque()
+        concurrency = max(1, self.options.transcribe_concurrency)
+        batch_size = max(1, self.options.transcribe_batch)
+        group: list[tuple[MessageEnvelope, Optional[asyncio.Task[Path]]]] = []
+        group_audio = 0
 
-        output_path: Optional[Path] = None
+        # The transcript is written entry by entry as results come in, so only
+        # the counts are kept in memory. The output is opened with the first
+        # entry and only replaces the previous file once the run succeeds.
+        outputs = ExitStack()
+        output: Optional[TextIO] = None
+        current_day: Optional[str] = None
+        events = self._open_events(outputs)
 
-        if transcript_entries:
-            markdown = self.exporter.render(transcript_entries)
-            self.writer.write(self.options.output_path, markdown)
-            output_path = self.options.output_path
+        def collect(entries: list[Optional[TranscriptEntry]]) -> None:
+            nonlocal output, current_day
+            finished: list[int] = []
+            for entry in entries:
+                if entry is None:
+                    continue
+                if output is None:
+                    output = outputs.enter_context(
+                        self.writer.open(self.options.output_path)
+                    )
+                    output.write(self.exporter.render_header())
+                current_day, line = self.exporter.render_entry(entry, current_day)
+                output.write(line)
+                finished.append(entry.message_id)
+                counts[entry.message_type] += 1
+                if events is not None:
+                    _emit(events, "chunk_done", id=entry.message_id, type=entry.message_type.name)
+                if self.on_entry is not None:
+                    self.on_entry(entry)
+            self.state.record_processed_many(finished)
+
+        log_progress = logger.isEnabledFor(logging.INFO)
+        with outputs:
+            try:
+                for message in included:
+                    if log_progress:
+                        logger.info(
+                            "Processing %s %s #%s",
+                            message.date.strftime("%Y-%m-%d %H:%M"),
+                            message.message_type.name,
+                            message.message_id,
+                        )
+                    download = None
+                    if message.message_type in AUDIO_TYPES:
+                        download = await downloads.get()
+                        window.release()
+                        group_audio += 1
+                    group.append((message, download))
+                    if group_audio < batch_size:
+                        continue
+                    processing.append(asyncio.create_task(self._process_group(group)))
+                    group, group_audio = [], 0
+                    if len(processing) >= concurrency:
+                        collect(await processing.popleft())
+                if group:
+                    processing.append(asyncio.create_task(self._process_group(group)))
+                while processing:
+                    collect(await processing.popleft())
+                if events is not None:
+                    _emit(events, "transcribe_finished", processed=sum(counts.values()))
+            finally:
+                producer.cancel()
+                for task in processing:
+                    task.cancel()
+                while not downloads.empty():
+                    downloads.get_nowait().cancel()
 
         self.state.flush()
+        if self.transcript_cache is not None:
+            self.transcript_cache.flush()
         return ProcessingSummary(
-            processed_messages=len(transcript_entries),
+            processed_messages=sum(counts.values()),
             type_counts=dict(counts),
-            output_path=output_path,
+            output_path=self.options.output_path if output is not None else None,
+        )
+
+    def _open_events(self, stack: ExitStack) -> Optional[TextIO]:
+        path = self.options.events_path
+        if path is None:
+            return None
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Line buffered, so every event is visible to readers once written.
+        return stack.enter_context(path.open("w", encoding="utf-8", buffering=1))
+
+    def _select(self, messages: Iterable[MessageEnvelope]) -> list[MessageEnvelope]:
+        processed = self.state.processed_ids
+        pending = [
+            message for message in messages if message.message_id not in processed
+        ]
+        if self.options.pre_filtered:
+            return pending
+        return filter_messages(
+            pending, self.filter_config, self_user_id=self.self_user_id
         )
 
+    async def _produce_downloads(
+        self,
+        messages: list[MessageEnvelope],
+        downloads: asyncio.Queue[asyncio.Task[Path]],
+        window: asyncio.Semaphore,
+    ) -> None:
+        in_flight = asyncio.Semaphore(max(1, self.options.download_concurrency))
+
+        async def download(message: MessageEnvelope) -> Path:
+            async with in_flight:
+                return await self.downloader.download(message)
+
+        for message in messages:
+            await window.acquire()
+            downloads.put_nowait(asyncio.create_task(download(message)))
+
+    async def _process_group(
+        self,
+        group: list[tuple[MessageEnvelope, Optional[asyncio.Task[Path]]]],
+    ) -> list[Optional[TranscriptEntry]]:
+        audio = [
+            (message, download) for message, download in group if download is not None
+        ]
+        if self.options.transcribe_batch <= 1 or len(audio) <= 1:
+            return [
+                await self._process_message(message, download)
+                for message, download in group
+            ]
+
+        contents = await self._transcribe_many(audio)
+        return [
+            self._entry(message, contents[message.message_id])
+            if download is not None
+            else await self._process_message(message)
+            for message, download in group
+        ]
+
+    async def _transcribe_many(
+        self, audio: list[tuple[MessageEnvelope, asyncio.Task[Path]]]
+    ) -> dict[int, str]:
+        contents: dict[int, str] = {}
+        paths: dict[int, Path] = {}
+        for message, download in audio:
+            try:
+                paths[message.message_id] = await download
+            except Exception as e:
+                logger.warning("Transcription failed for message %s: %s", message.message_id, e)
+                contents[message.message_id] = _FAILED_TRANSCRIPTION
+
+        if not paths:
+            return contents
+        transcriber = cast(BatchTranscriber, self.transcriber)
+        try:
+            transcriptions = await _run_blocking(
+                self._transcription_executor(),
+                self._transcribe_paths,
+                transcriber,
+                list(paths.values()),
+            )
+        except Exception as e:
+            logger.warning("Batch transcription failed, retrying one by one: %s", e)
+            for message, download in audio:
+                if message.message_id in paths:
+                    contents[message.message_id] = await self._transcribe(message, download)
+            return contents
+
+        for message_id, transcription in zip(paths, transcriptions):
+            contents[message_id] = transcription.strip() or _EMPTY_TRANSCRIPTION
+        return contents
+
     async def _process_message(
-        self, message: MessageEnvelope
+        self,
+        message: MessageEnvelope,
+        download: Optional[asyncio.Task[Path]] = None,
     ) -> Optional[TranscriptEntry]:
-        content: Optional[str] = None
-
         if message.message_type is MessageType.TEXT:
-            if message.text:
-                content = message.text
-            else:
+            if not message.text:
                 return None
-        elif message.message_type in {
-            MessageType.VOICE,
-            MessageType.AUDIO,
-            MessageType.VIDEO_NOTE,
-        }:
-            try:
+            return self._entry(message, message.text)
+        if message.message_type in AUDIO_TYPES:
+            return self._entry(message, await self._transcribe(message, download))
+        return None
+
+    async def _transcribe(
+        self,
+        message: MessageEnvelope,
+        download: Optional[asyncio.Task[Path]] = None,
+    ) -> str:
+        try:
+            if download is None:
                 audio_path = await self.downloader.download(message)
-                transcription = self.transcriber.transcribe(audio_path).strip()
-                content = transcription or "[Leere Transkription]"
-            except Exception as e:
-                logger.warning("Transcription failed for message %s: %s", message.message_id, e)
-                content = "[Transkription fehlgeschlagen]"
-        else:
-            return None
+            else:
+                audio_path = await download
+            # Whisper is CPU/GPU-bound; running it in a worker thread keeps the
+            # event loop free so pending downloads progress during inference.
+            transcription = (
+                await _run_blocking(
+                    self._transcription_executor(),
+                    self._transcribe_path,
+                    audio_path,
+                )
+            ).strip()
+            return transcription or _EMPTY_TRANSCRIPTION
+        except Exception as e:
+            logger.warning("Transcription failed for message %s: %s", message.message_id, e)
+            return _FAILED_TRANSCRIPTION
 
+    # The two helpers below run on the transcription executor, so hashing the
+    # audio for the cache stays off the event loop as well.
+    def _transcribe_path(self, audio_path: Path) -> str:
+        cache = self.transcript_cache
+        if cache is None:
+            return self.transcriber.transcribe(audio_path)
+        digest = file_digest(audio_path)
+        transcription = cache.get(digest)
+        if transcription is None:
+            transcription = self.transcriber.transcribe(audio_path)
+            cache.put(digest, transcription)
+        return transcription
+
+    def _transcribe_paths(
+        self, transcriber: BatchTranscriber, audio_paths: list[Path]
+    ) -> list[str]:
+        cache = self.transcript_cache
+        if cache is None:
+            return transcriber.transcribe_batch(audio_paths)
+        digests = [file_digest(path) for path in audio_paths]
+        transcriptions = [cache.get(digest) for digest in digests]
+        missing = [index for index, text in enumerate(transcriptions) if text is None]
+        if missing:
+            fresh = transcriber.transcribe_batch([audio_paths[index] for index in missing])
+            for index, transcription in zip(missing, fresh):
+                cache.put(digests[index], transcription)
+                transcriptions[index] = transcription
+        return cast(list[str], transcriptions)
+
+    @staticmethod
+    def _entry(message: MessageEnvelope, content: str) -> TranscriptEntry:
         return TranscriptEntry(
             message_id=message.message_id,
             timestamp=message.date,
@@ -155,3 +419,15 @@ class ProcessingPipeline:
             message_type=message.message_type,
             content=content,
         )
+
+
+def _emit(events: TextIO, event: str, **fields: Any) -> None:
+    events.write(json.dumps({"event": event, **fields, "ts": time.time()}) + "\n")
+
+
+async def _run_blocking(
+    executor: Executor, func: Callable[..., T], *args: Any
+) -> T:
+    # Like asyncio.to_thread, minus the contextvars copy and functools.partial
+    # it allocates per call; nothing in the pipeline relies on context variables.
+    return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
@@ -1,59 +1,328 @@
 from __future__ import annotations
 
+import base64
+import hashlib
 import json
-from collections import deque
+import logging
+import os
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Deque, Set
+from typing import Any, Iterable, Optional, Union
 
+try:
+    import orjson
+except ImportError:  # optional speedup, see the "speedups" extra
+    orjson = None
 
-@dataclass
+logger = logging.getLogger(__name__)
+
+
+def _dumps(payload: Any) -> bytes:
+    # The state is only read back by this module, so it is written compactly.
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+
+def _loads(data: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    """Replace ``path`` with ``data`` so that a crash leaves the old or the new file."""
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "wb") as handle:
+        handle.write(data)
+        handle.flush()
+        # Without this the rename can reach the disk before the data does.
+        os.fsync(handle.fileno())
+    os.replace(tmp_path, path)
+    try:
+        dir_fd = os.open(path.parent, os.O_DIRECTORY)
+    except (AttributeError, OSError):
+        return  # no directory handles on Windows
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+
+def _read_log(path: Path) -> list[int]:
+    """IDs appended to a ProcessingState ``.log`` file, oldest first."""
+    try:
+        lines = path.read_bytes().split()
+    except OSError:
+        return []
+    ids = []
+    for line in lines:
+        try:
+            ids.append(int(line))
+        except ValueError:
+            continue  # a line cut short by a crash
+    return ids
+
+
+@dataclass(slots=True)
 class ProcessingState:
+    """The most recent ``max_history`` processed message IDs.
+
+    IDs recorded since the last flush are appended to a ``.log`` file next to
+    the JSON snapshot, so a flush writes only the new IDs. Once the log outgrows
+    the snapshot both are compacted into a fresh snapshot.
+    """
+
     state_path: Path
     max_history: int = 2000
-    _ordered_ids: Deque[int] = field(init=False, repr=False, default_factory=deque)
-    _id_index: Set[int] = field(init=False, repr=False, default_factory=set)
-    _dirty: bool = field(init=False, repr=False, default=False)
+    # Insertion-ordered, so the oldest ID is trimmed first; values are unused.
+    _ids: OrderedDict[int, None] = field(init=False, repr=False, default_factory=OrderedDict)
+    _pending: list[int] = field(init=False, repr=False, default_factory=list)
+
+    @property
+    def log_path(self) -> Path:
+        return self.state_path.with_suffix(".log")
 
     def __post_init__(self) -> None:
         if self.state_path.exists():
             try:
-                data = json.loads(self.state_path.read_text(encoding="utf-8"))
+                data = _loads(self.state_path.read_bytes())
                 ids = data.get("processed_ids", [])
                 for message_id in ids[-self.max_history :]:
                     if isinstance(message_id, int):
-                        self._ordered_ids.append(message_id)
-                        self._id_index.add(message_id)
-            except (json.JSONDecodeError, OSError):
+                        self._ids[message_id] = None
+            except (ValueError, OSError):
                 # Start fresh if the state is unreadable.
-                self._ordered_ids = deque()
-                self._id_index = set()
+                self._ids = OrderedDict()
+        for message_id in _read_log(self.log_path):
+            self._remember(message_id)
 
     def has_processed(self, message_id: int) -> bool:
-        return message_id in self._id_index
+        return message_id in self._ids
+
+    @property
+    def processed_ids(self) -> frozenset[int]:
+        """Snapshot of processed IDs for membership tests over many messages."""
+        return frozenset(self._ids)
 
     def record_processed(self, message_id: int) -> None:
-        if message_id in self._id_index:
+        if message_id in self._ids:
             return
-        self._ordered_ids.append(message_id)
-        self._id_index.add(message_id)
-        self._dirty = True
-        self._trim()
+        self._remember(message_id)
+        self._pending.append(message_id)
+
+    def record_processed_many(self, message_ids: Iterable[int]) -> None:
+        """Record several IDs at once, trimming the history a single time."""
+        new_ids = [
+            message_id for message_id in dict.fromkeys(message_ids) if message_id not in self._ids
+        ]
+        self._ids.update(dict.fromkeys(new_ids))
+        for _ in range(len(self._ids) - self.max_history):
+            self._ids.popitem(last=False)
+        self._pending.extend(new_ids)
 
-    def _trim(self) -> None:
-        excess = len(self._ordered_ids) - self.max_history
-        if excess <= 0:
+    def _remember(self, message_id: int) -> None:
+        self._ids[message_id] = None
+        if len(self._ids) > self.max_history:
+            self._ids.popitem(last=False)
+
+    def flush(self) -> None:
+        if not self._pending:
             return
-        for _ in range(excess):
-            oldest = self._ordered_ids.popleft()
-            self._id_index.discard(oldest)
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.log_path, "ab") as handle:
+            handle.write("".join(f"{message_id}\n" for message_id in self._pending).encode("ascii"))
+            handle.flush()
+            os.fsync(handle.fileno())
+            log_size = handle.tell()
+        self._pending.clear()
+        try:
+            snapshot_size = self.state_path.stat().st_size
+        except OSError:
+            snapshot_size = 0
+        if log_size > snapshot_size:
+            self._compact()
+
+    def _compact(self) -> None:
+        # _remember keeps the history within max_history, so no slicing is needed.
+        payload = {"processed_ids": list(self._ids)}
+        _write_atomic(self.state_path, _dumps(payload))
+        # A crash before the unlink only replays IDs the snapshot already holds.
+        self.log_path.unlink(missing_ok=True)
+
+
+@dataclass(slots=True)
+class BloomProcessingState:
+    """Processed-ID record of constant size for histories too long to keep exactly.
+
+    IDs are set in a Bloom filter of ``bits`` bits using ``hashes`` probes, so
+    nothing is ever forgotten, but a false positive makes a new message look
+    processed and skips it (about 0.8 % at 100k IDs with the defaults).
+    """
+
+    state_path: Path
+    bits: int = 1 << 20
+    hashes: int = 7
+    _filter: bytearray = field(init=False, repr=False)
+    _dirty: bool = field(init=False, repr=False, default=False)
+
+    def __post_init__(self) -> None:
+        if self.bits <= 0 or self.bits % 8:
+            raise ValueError(f"bits muss ein positives Vielfaches von 8 sein: {self.bits}")
+        self._filter = bytearray(self.bits // 8)
+        bloom = None
+        if self.state_path.exists():
+            try:
+                data = _loads(self.state_path.read_bytes())
+                bloom = data.get("bloom")
+                if bloom is None:
+                    # Carry over the history of an exact ProcessingState file.
+                    for message_id in data.get("processed_ids", []):
+                        if isinstance(message_id, int):
+                            self.record_processed(message_id)
+                elif bloom["bits"] == self.bits and bloom["hashes"] == self.hashes:
+                    self._filter = bytearray(base64.b64decode(bloom["filter"]))
+                else:
+                    logger.warning(
+                        "Ignoring Bloom filter in %s built with bits=%s hashes=%s "
+                        "(expected bits=%s hashes=%s); processed history starts empty",
+                        self.state_path,
+                        bloom["bits"],
+                        bloom["hashes"],
+                        self.bits,
+                        self.hashes,
+                    )
+            except (ValueError, KeyError, OSError):
+                # Start fresh if the state is unreadable.
+                self._filter = bytearray(self.bits // 8)
+        if bloom is None:
+            # IDs the exact state appended since its last compaction.
+            for message_id in _read_log(self.state_path.with_suffix(".log")):
+                self.record_processed(message_id)
+
+    def _positions(self, message_id: int) -> list[int]:
+        digest = hashlib.blake2b(
+            message_id.to_bytes(8, "big", signed=True), digest_size=4 * self.hashes
+        ).digest()
+        return [
+            int.from_bytes(digest[offset : offset + 4], "big") % self.bits
+            for offset in range(0, len(digest), 4)
+        ]
+
+    def __contains__(self, message_id: object) -> bool:
+        if not isinstance(message_id, int):
+            return False
+        return all(
+            self._filter[position >> 3] & (1 << (position & 7))
+            for position in self._positions(message_id)
+        )
+
+    def has_processed(self, message_id: int) -> bool:
+        return message_id in self
+
+    @property
+    def processed_ids(self) -> BloomProcessingState:
+        """The filter itself; it only supports membership tests."""
+        return self
+
+    def record_processed(self, message_id: int) -> None:
+        for position in self._positions(message_id):
+            self._filter[position >> 3] |= 1 << (position & 7)
+        self._dirty = True
+
+    def record_processed_many(self, message_ids: Iterable[int]) -> None:
+        bloom = self._filter
+        for message_id in message_ids:
+            for position in self._positions(message_id):
+                bloom[position >> 3] |= 1 << (position & 7)
+            self._dirty = True
 
     def flush(self) -> None:
         if not self._dirty:
             return
         self.state_path.parent.mkdir(parents=True, exist_ok=True)
-        payload = {"processed_ids": list(self._ordered_ids)[-self.max_history :]}
-        tmp_path = self.state_path.with_suffix(".tmp")
-        tmp_path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
-        tmp_path.replace(self.state_path)
+        payload = {
+            "bloom": {
+                "bits": self.bits,
+                "hashes": self.hashes,
+                "filter": base64.b64encode(self._filter).decode("ascii"),
+            }
+        }
+        _write_atomic(self.state_path, _dumps(payload))
         self._dirty = False
+
+
+@dataclass(slots=True)
+class TranscriptCache:
+    """Transcripts of earlier recordings, keyed by the audio's SHA-256 digest.
+
+    Forwarded voice notes are byte-identical copies, so a hit saves a whole
+    Whisper run. ``namespace`` (model and language) is part of every key, so
+    changing either transcribes again. The oldest entries beyond ``max_entries``
+    are dropped. Lookups and stores may come from several transcription threads.
+    """
+
+    cache_path: Path
+    namespace: str = ""
+    max_entries: int = 5000
+    _entries: dict[str, str] = field(init=False, repr=False, default_factory=dict)
+    _dirty: bool = field(init=False, repr=False, default=False)
+    _lock: threading.Lock = field(
+        init=False, repr=False, compare=False, default_factory=threading.Lock
+    )
+
+    def __post_init__(self) -> None:
+        if self.cache_path.exists():
+            try:
+                entries = _loads(self.cache_path.read_bytes()).get("transcripts", {})
+                self._entries = {
+                    key: text for key, text in entries.items() if isinstance(text, str)
+                }
+            except (ValueError, AttributeError, OSError):
+                # Start fresh if the cache is unreadable.
+                self._entries = {}
+
+    def get(self, digest: str) -> Optional[str]:
+        with self._lock:
+            return self._entries.get(f"{self.namespace}:{digest}")
+
+    def put(self, digest: str, transcript: str) -> None:
+        with self._lock:
+            self._entries[f"{self.namespace}:{digest}"] = transcript
+            self._dirty = True
+            while len(self._entries) > self.max_entries:
+                del self._entries[next(iter(self._entries))]
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            data = _dumps({"transcripts": self._entries})
+            self._dirty = False
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        _write_atomic(self.cache_path, data)
+
+
+def file_digest(path: Path) -> str:
+    """Hex SHA-256 of the file at ``path``, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+StateStore = Union[ProcessingState, BloomProcessingState]
+
+STATE_BACKENDS = ("exact", "bloom")
+
+
+def open_state(state_path: Path, backend: str = "exact") -> StateStore:
+    """Load the processed-ID record kept by ``backend`` ("exact" or "bloom")."""
+    if backend == "bloom":
+        return BloomProcessingState(state_path)
+    if backend == "exact":
+        return ProcessingState(state_path)
+    raise ValueError(f"Unbekanntes State-Backend: {backend}")
@@ -2,9 +2,17 @@ from __future__ import annotations
 
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
-from typing import Any, Dict, Iterable, List, Optional
-
-from .filters import FilterConfig, MessageType, determine_message_type
+from itertools import pairwise
+from operator import attrgetter
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from .filters import (
+    AUDIO_TYPES,
+    FilterConfig,
+    MessageType,
+    determine_message_type,
+    should_include_message,
+)
 from .models import MessageEnvelope
 
 
@@ -13,6 +21,7 @@ class CollectionResult:
     chat_title: str
     self_user_id: Optional[int]
     messages: List[MessageEnvelope]
+    sender_ids: Set[int] = field(default_factory=set)
 
 
 class TelegramCollector:
@@ -35,6 +44,9 @@ class TelegramCollector:
         chat_title = _display_title(entity)
 
         messages: List[MessageEnvelope] = []
+        sender_ids: Set[int] = set()
+        # One message per sender whose display could not be read from the message.
+        unresolved: Dict[int, Any] = {}
         async for message in self._client.iter_messages(
             entity,
             limit=None,
@@ -51,14 +63,33 @@ class TelegramCollector:
             )
             if envelope is None:
                 continue
+            if not should_include_message(
+                envelope, filter_config, self_user_id=self_user_id
+            ):
+                continue
             messages.append(envelope)
-
-        ordered = sorted(messages, key=lambda item: item.date)
+            sender_ids.add(envelope.sender_id)
+            # Only senders of kept messages are looked up, all at once below.
+            if envelope.sender_id not in self._display_cache:
+                unresolved.setdefault(envelope.sender_id, message)
+
+        if unresolved:
+            await self._resolve_senders(unresolved)
+            for envelope in messages:
+                if envelope.sender_id in unresolved:
+                    envelope.sender_display = self._display_cache[envelope.sender_id]
+
+        # iter_messages yields newest first, so reversing restores chronological
+        # order; only sort if the server ever hands them out of order.
+        messages.reverse()
+        if any(later.date < earlier.date for earlier, later in pairwise(messages)):
+            messages.sort(key=attrgetter("date"))
 
         return CollectionResult(
             chat_title=chat_title,
             self_user_id=self_user_id,
-            messages=ordered,
+            messages=messages,
+            sender_ids=sender_ids,
         )
 
     async def _build_envelope(
@@ -69,17 +100,21 @@ class TelegramCollector:
     ) -> Optional[MessageEnvelope]:
         sender_id = getattr(message, "sender_id", None)
         if sender_id is None:
-            sender = await message.get_sender()
+            # Telethon usually attaches the sender from the response's entities;
+            # only ask the server when it did not.
+            sender = getattr(message, "sender", None)
+            if sender is None:
+                sender = await message.get_sender()
             sender_id = getattr(sender, "id", None)
         if sender_id is None:
             return None
 
         message_type = determine_message_type(message)
-        if allowed_types and message_type not in allowed_types and message_type is not MessageType.TEXT:
-            # Always allow text messages for context even if not explicitly listed.
+        if message_type not in allowed_types:
+            # Checked before resolving the sender display to avoid needless lookups.
             return None
 
-        sender_display = await self._resolve_sender_display(message, sender_id)
+        sender_display = self._sender_display(message, sender_id)
         text = getattr(message, "message", None)
 
         if message_type is MessageType.TEXT and not text:
@@ -93,21 +128,38 @@ class TelegramCollector:
             date=timestamp,
             message_type=message_type,
             text=text,
-            raw_message=message,
+            # Only media needs the Telethon object (for the download); dropping it
+            # for text keeps large collections from pinning every message tree.
+            raw_message=message if message_type in AUDIO_TYPES else None,
         )
 
-    async def _resolve_sender_display(self, message: Any, sender_id: int) -> str:
-        if sender_id in self._display_cache:
-            return self._display_cache[sender_id]
+    def _sender_display(self, message: Any, sender_id: int) -> str:
+        display = self._display_cache.get(sender_id)
+        if display is not None:
+            return display
 
         sender = getattr(message, "sender", None)
         if sender is None:
-            sender = await message.get_sender()
+            # A placeholder until collect() resolves the senders it keeps.
+            return str(sender_id)
 
-        display = _display_title(sender) if sender else str(sender_id)
+        display = _display_title(sender)
         self._display_cache[sender_id] = display
         return display
 
+    async def _resolve_senders(self, unresolved: Dict[int, Any]) -> None:
+        """Fill the display cache for ``unresolved`` senders in one request."""
+        sender_ids = list(unresolved)
+        try:
+            senders = await self._client.get_entity(sender_ids)
+        except (ValueError, TypeError):
+            # Some sender is unknown to the session; ask each message instead.
+            senders = [await unresolved[sender_id].get_sender() for sender_id in sender_ids]
+        for sender_id, sender in zip(sender_ids, senders):
+            self._display_cache[sender_id] = (
+                _display_title(sender) if sender else str(sender_id)
+            )
+
 
 async def list_dialogs(client: Any, limit: int = 50) -> list[dict]:
     """List recent dialogs/chats for selection UI."""
@@ -137,6 +189,9 @@ def _display_title(entity: Any) -> str:
 def _ensure_timezone(dt: Optional[datetime]) -> Optional[datetime]:
     if dt is None:
         return None
+    # Telethon already hands out UTC datetimes; skip the conversion for those.
+    if dt.tzinfo is timezone.utc:
+        return dt
     if dt.tzinfo is None:
         return dt.replace(tzinfo=timezone.utc)
     return dt.astimezone(timezone.utc)
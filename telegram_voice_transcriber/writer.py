@@ -1,11 +1,43 @@
 from __future__ import annotations
 
+import os
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Iterable, Iterator, TextIO, Union
+
+# Large write buffer so long transcripts are flushed in few syscalls.
+WRITE_BUFFER_SIZE = 1 << 20
 
 
 class FileWriter:
     """Writes rendered Markdown to disk."""
 
-    def write(self, target: Path, content: str) -> None:
+    def write(self, target: Path, content: Union[str, Iterable[str]]) -> None:
+        """Replace ``target`` with a string, or stream an iterable of lines into it.
+
+        Like ``open``, the old file is only replaced once everything is on disk.
+        """
+        with self.open(target) as handle:
+            if isinstance(content, str):
+                handle.write(content)
+            else:
+                handle.writelines(content)
+
+    @contextmanager
+    def open(self, target: Path) -> Iterator[TextIO]:
+        """Write ``target`` incrementally; it only replaces the old file on success.
+
+        The text goes to a temporary file next to ``target`` that is renamed
+        over it when the block exits normally and removed if it raises.
+        """
         target.parent.mkdir(parents=True, exist_ok=True)
-        target.write_text(content, encoding="utf-8")
+        tmp_path = target.with_suffix(target.suffix + ".tmp")
+        try:
+            with tmp_path.open("w", encoding="utf-8", buffering=WRITE_BUFFER_SIZE) as handle:
+                yield handle
+                handle.flush()
+                os.fsync(handle.fileno())
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        os.replace(tmp_path, target)
@@ -1,4 +1,6 @@
 import asyncio
+import threading
+
 import pytest
 from telegram_voice_transcriber.async_helpers import run_async
 
@@ -20,3 +22,35 @@ def test_run_async_handles_existing_loop():
     # This tests that run_async works even if called from sync context
     result = run_async(outer())
     assert result == "nested"
+
+
+def test_run_async_reuses_persistent_loop():
+    async def current_loop():
+        return asyncio.get_running_loop()
+
+    assert run_async(current_loop()) is run_async(current_loop())
+
+
+def test_run_async_reuses_nested_worker_thread():
+    async def thread_name():
+        return threading.current_thread().name
+
+    async def outer():
+        return run_async(thread_name())
+
+    assert run_async(outer()).startswith("run_async-nested")
+    assert run_async(outer()).startswith("run_async-nested")
+
+
+def test_run_async_handles_two_nesting_levels():
+    async def leaf():
+        return 1
+
+    async def mid():
+        return run_async(leaf())
+
+    async def outer():
+        return run_async(mid())
+
+    assert run_async(outer()) == 1
+
@@ -114,3 +114,80 @@ def test_cli_verbose_flag_calls_run(monkeypatch, tmp_path):
 
     assert result.exit_code == 0
     assert called["run"] is True
+
+
+def test_cli_passes_batch_size(monkeypatch, tmp_path):
+    captured = {}
+
+    async def fake_run_app(config, console, *, count=None):
+        captured["config"] = config
+
+    monkeypatch.setattr("telegram_voice_transcriber.cli.run_app", fake_run_app)
+
+    result = runner.invoke(
+        app,
+        [
+            "Alice Example",
+            "--data-dir",
+            str(tmp_path / "data"),
+            "--batch-size",
+            "8",
+            "--beam-size",
+            "3",
+            "--group-size",
+            "4",
+        ],
+        env={"TG_API_ID": "123", "TG_API_HASH": "abc"},
+    )
+
+    assert result.exit_code == 0
+    assert captured["config"].batch_size == 8
+    assert captured["config"].beam_size == 3
+    assert captured["config"].group_size == 4
+
+
+def test_cli_passes_device_overrides(monkeypatch, tmp_path):
+    captured = {}
+
+    async def fake_run_app(config, console, *, count=None):
+        captured["config"] = config
+
+    monkeypatch.setattr("telegram_voice_transcriber.cli.run_app", fake_run_app)
+
+    result = runner.invoke(
+        app,
+        [
+            "Alice Example",
+            "--data-dir",
+            str(tmp_path / "data"),
+            "--device",
+            "cpu",
+            "--compute-type",
+            "int8",
+            "--workers",
+            "3",
+        ],
+        env={"TG_API_ID": "123", "TG_API_HASH": "abc"},
+    )
+
+    assert result.exit_code == 0
+    assert captured["config"].device == "cpu"
+    assert captured["config"].compute_type == "int8"
+    assert captured["config"].workers == 3
+
+
+def test_requires_transcription_skips_processed_audio(tmp_path):
+    from types import SimpleNamespace
+
+    from telegram_voice_transcriber.cli import requires_transcription
+    from telegram_voice_transcriber.filters import MessageType
+    from telegram_voice_transcriber.state import ProcessingState
+
+    state = ProcessingState(state_path=tmp_path / "state.json")
+    state.record_processed(1)
+    config = SimpleNamespace(dry_run=False)
+    voice = SimpleNamespace(message_id=1, message_type=MessageType.VOICE)
+    text = SimpleNamespace(message_id=2, message_type=MessageType.TEXT)
+
+    assert requires_transcription(config, state, [voice, text]) is False
+    assert requires_transcription(config, state, [text, SimpleNamespace(message_id=3, message_type=MessageType.AUDIO)]) is True
@@ -44,3 +44,23 @@ def test_build_app_config_sets_paths(tmp_path: Path):
 
     assert cfg.chat_slug == "alice-example"
     assert cfg.paths.output_path.name == "alice-example-2025.md"
+
+
+def test_build_app_config_rejects_unknown_state_backend(tmp_path: Path):
+    with pytest.raises(ValueError):
+        build_app_config(
+            api_id=1,
+            api_hash="hash",
+            session_file=tmp_path / "session.session",
+            chat_identifier="Alice Example",
+            year=2025,
+            include_self=False,
+            include_types=["voice"],
+            include_message_ids=True,
+            timezone_name="Europe/Vienna",
+            dry_run=False,
+            language="de",
+            model_size="small",
+            base_dir=tmp_path / "data",
+            state_backend="redis",
+        )
@@ -4,7 +4,7 @@ from types import SimpleNamespace
 
 import pytest
 
-from telegram_voice_transcriber.download import MediaDownloader
+from telegram_voice_transcriber.download import MediaDownloader, _infer_extension
 from telegram_voice_transcriber.filters import MessageType
 from telegram_voice_transcriber.models import MessageEnvelope
 
@@ -35,7 +35,6 @@ def make_message(message_id: int, message_type: MessageType) -> MessageEnvelope:
     )
 
 
-@pytest.mark.asyncio
 async def test_downloads_media_to_cache(tmp_path: Path):
     client = StubClient()
     downloader = MediaDownloader(client=client, base_dir=tmp_path)
@@ -52,7 +51,6 @@ async def test_downloads_media_to_cache(tmp_path: Path):
     assert path.parent.parent.name == "2025"
 
 
-@pytest.mark.asyncio
 async def test_skips_download_when_file_exists(tmp_path: Path):
     client = StubClient()
     downloader = MediaDownloader(client=client, base_dir=tmp_path)
@@ -66,3 +64,20 @@ async def test_skips_download_when_file_exists(tmp_path: Path):
 
     assert path == existing
     assert client.calls == []
+
+
+@pytest.mark.parametrize(
+    ("raw", "message_type", "expected"),
+    [
+        (SimpleNamespace(file=SimpleNamespace(ext="m4a")), MessageType.AUDIO, ".m4a"),
+        (SimpleNamespace(file=None, document=SimpleNamespace(ext=".oga")), MessageType.VOICE, ".oga"),
+        (SimpleNamespace(file=SimpleNamespace(ext=None, mime_type="audio/mpeg")), MessageType.VOICE, ".mp3"),
+        (SimpleNamespace(), MessageType.VIDEO_NOTE, ".mp4"),
+        (SimpleNamespace(), MessageType.OTHER, ".bin"),
+    ],
+)
+def test_infer_extension_fallbacks(raw, message_type, expected):
+    message = make_message(1, message_type)
+    message.raw_message = raw
+
+    assert _infer_extension(message) == expected
@@ -31,3 +31,22 @@ def test_dry_run_counts_messages():
     assert stats.type_counts[MessageType.VOICE] == 1
     assert stats.type_counts[MessageType.TEXT] == 1
     assert len(stats.example_messages) == 2
+
+
+def test_dry_run_keeps_first_examples_only():
+    report = DryRunReport(chat_title="Alice Example", year=2025, sample_size=2)
+
+    for message_id in range(1, 5):
+        report.add(
+            MessageSummary(
+                message_id=message_id,
+                timestamp=datetime(2025, 1, 1, 8, message_id, tzinfo=timezone.utc),
+                sender_display="Alice",
+                message_type=MessageType.VOICE,
+            )
+        )
+
+    stats = report.finalise()
+
+    assert stats.total_messages == 4
+    assert [example.message_id for example in stats.example_messages] == [1, 2]
@@ -1,4 +1,4 @@
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 
 import pytest
 
@@ -6,114 +6,132 @@ from telegram_voice_transcriber.filters import (
     FilterConfig,
     MessageEnvelope,
     MessageType,
+    filter_messages,
     should_include_message,
 )
 
 
-@pytest.fixture
-def alice_user():
-    return 12345
-
-
-@pytest.fixture
-def lukasz_user():
-    return 67890
-
-
-def build_message(
-    message_id: int,
-    sender_id: int,
-    *,
-    year: int = 2025,
-    month: int = 1,
-    day: int = 1,
-    hour: int = 12,
-    message_type: MessageType = MessageType.VOICE,
-    has_text: bool = False,
-) -> MessageEnvelope:
-    text = "Hallo" if has_text else None
-    return MessageEnvelope(
-        message_id=message_id,
-        sender_id=sender_id,
-        sender_display="Alice" if sender_id == 12345 else "Lukasz",
-        date=datetime(year, month, day, hour, 0, tzinfo=timezone.utc),
-        message_type=message_type,
-        text=text,
-    )
+ALICE = 12345
+LUKASZ = 67890
 
+_UTC = timezone.utc
+# Noon on New Year's Day, shared by every message built for that year.
+_DATES = {year: datetime(year, 1, 1, 12, 0, tzinfo=_UTC) for year in (2024, 2025)}
 
-def test_includes_alice_voice_message_in_2025(alice_user, lukasz_user):
-    config = FilterConfig(
-        allowed_sender_ids={alice_user},
-        allowed_types={MessageType.VOICE, MessageType.TEXT},
-        year=2025,
-        include_self=False,
-    )
-    message = build_message(1, alice_user, message_type=MessageType.VOICE)
-    assert should_include_message(message, config, self_user_id=lukasz_user) is True
 
+@pytest.fixture(scope="session")
+def make_message():
+    def _build(message_id: int, sender_id: int, **overrides) -> MessageEnvelope:
+        fields = {
+            "sender_display": "Alice" if sender_id == ALICE else "Lukasz",
+            "date": _DATES[2025],
+            "message_type": MessageType.VOICE,
+            **overrides,
+        }
+        return MessageEnvelope(message_id=message_id, sender_id=sender_id, **fields)
 
-def test_excludes_messages_outside_year(alice_user, lukasz_user):
-    config = FilterConfig(
-        allowed_sender_ids={alice_user},
-        allowed_types={MessageType.VOICE, MessageType.TEXT},
-        year=2025,
-        include_self=False,
-    )
-    message = build_message(2, alice_user, year=2024)
-    assert should_include_message(message, config, self_user_id=lukasz_user) is False
+    return _build
 
 
-def test_skips_year_filter_when_none(alice_user, lukasz_user):
+@pytest.mark.parametrize(
+    "allowed_sender_ids,allowed_types,year,include_self,sender_id,message_year,message_type,expected",
+    [
+        pytest.param({ALICE}, {MessageType.VOICE, MessageType.TEXT}, 2025, False, ALICE, 2025, MessageType.VOICE, True, id="alice_voice_2025"),
+        pytest.param({ALICE}, {MessageType.VOICE, MessageType.TEXT}, 2025, False, ALICE, 2024, MessageType.VOICE, False, id="outside_year"),
+        pytest.param({ALICE}, {MessageType.VOICE, MessageType.TEXT}, None, False, ALICE, 2024, MessageType.VOICE, True, id="no_year_filter"),
+        pytest.param({ALICE}, {MessageType.VOICE}, 2025, False, LUKASZ, 2025, MessageType.VOICE, False, id="self_not_requested"),
+        pytest.param({ALICE}, {MessageType.VOICE}, 2025, True, LUKASZ, 2025, MessageType.VOICE, True, id="self_requested"),
+        pytest.param({ALICE}, {MessageType.VOICE}, 2025, False, ALICE, 2025, MessageType.TEXT, False, id="disallowed_type"),
+        pytest.param(None, {MessageType.VOICE}, 2025, False, ALICE, 2025, MessageType.VOICE, True, id="no_sender_restriction"),
+    ],
+)
+def test_should_include_message(
+    allowed_sender_ids,
+    allowed_types,
+    year,
+    include_self,
+    sender_id,
+    message_year,
+    message_type,
+    expected,
+    make_message,
+):
     config = FilterConfig(
-        allowed_sender_ids={alice_user},
-        allowed_types={MessageType.VOICE, MessageType.TEXT},
-        year=None,
-        include_self=False,
+        allowed_sender_ids=allowed_sender_ids,
+        allowed_types=allowed_types,
+        year=year,
+        include_self=include_self,
     )
-    message = build_message(2, alice_user, year=2024)
-    assert should_include_message(message, config, self_user_id=lukasz_user) is True
-
-
-def test_excludes_self_voice_when_not_requested(alice_user, lukasz_user):
-    config = FilterConfig(
-        allowed_sender_ids={alice_user},
-        allowed_types={MessageType.VOICE},
-        year=2025,
-        include_self=False,
+    message = make_message(
+        1,
+        sender_id,
+        date=_DATES[message_year],
+        message_type=message_type,
+        text="Hallo" if message_type is MessageType.TEXT else None,
     )
-    message = build_message(3, lukasz_user, message_type=MessageType.VOICE)
-    assert should_include_message(message, config, self_user_id=lukasz_user) is False
+    assert should_include_message(message, config, self_user_id=LUKASZ) is expected
 
 
-def test_includes_self_when_flag_enabled(alice_user, lukasz_user):
+@pytest.mark.parametrize("allowed_sender_ids", [None, {ALICE}])
+@pytest.mark.parametrize("include_self", [False, True])
+def test_filter_messages_matches_should_include_message(
+    allowed_sender_ids, include_self, make_message
+):
     config = FilterConfig(
-        allowed_sender_ids={alice_user},
+        allowed_sender_ids=allowed_sender_ids,
         allowed_types={MessageType.VOICE},
         year=2025,
-        include_self=True,
+        include_self=include_self,
     )
-    message = build_message(4, lukasz_user, message_type=MessageType.VOICE)
-    assert should_include_message(message, config, self_user_id=lukasz_user) is True
-
-
-def test_excludes_disallowed_type(alice_user, lukasz_user):
+    messages = [
+        make_message(1, ALICE),
+        make_message(2, LUKASZ),
+        make_message(3, ALICE, date=_DATES[2024]),
+        make_message(4, ALICE, message_type=MessageType.TEXT, text="Hallo"),
+        make_message(5, 999),
+    ]
+
+    expected = [
+        message
+        for message in messages
+        if should_include_message(message, config, self_user_id=LUKASZ)
+    ]
+    assert filter_messages(messages, config, self_user_id=LUKASZ) == expected
+
+
+def test_year_filter_uses_utc_calendar_year(make_message):
     config = FilterConfig(
-        allowed_sender_ids={alice_user},
+        allowed_sender_ids=None,
         allowed_types={MessageType.VOICE},
         year=2025,
         include_self=False,
     )
-    message = build_message(5, alice_user, message_type=MessageType.TEXT, has_text=True)
-    assert should_include_message(message, config, self_user_id=lukasz_user) is False
+    vienna = timezone(timedelta(hours=1))
+    new_year_local = make_message(7, ALICE, date=datetime(2025, 1, 1, 0, 30, tzinfo=vienna))
+    last_utc_minute = make_message(8, ALICE, date=datetime(2025, 12, 31, 23, 59, tzinfo=_UTC))
+
+    assert should_include_message(new_year_local, config, self_user_id=LUKASZ) is False
+    assert filter_messages(
+        [new_year_local, last_utc_minute], config, self_user_id=LUKASZ
+    ) == [last_utc_minute]
 
 
-def test_includes_when_no_sender_restriction(alice_user, lukasz_user):
+def test_filter_messages_reads_naive_dates_as_utc(make_message):
     config = FilterConfig(
         allowed_sender_ids=None,
         allowed_types={MessageType.VOICE},
         year=2025,
         include_self=False,
     )
-    message = build_message(6, alice_user, message_type=MessageType.VOICE)
-    assert should_include_message(message, config, self_user_id=lukasz_user) is True
+    messages = [
+        make_message(1, ALICE, date=datetime(2025, 6, 1, 12, 0)),
+        make_message(2, ALICE, date=datetime(2024, 12, 31, 23, 59)),
+    ]
+
+    expected = [
+        message
+        for message in messages
+        if should_include_message(message, config, self_user_id=LUKASZ)
+    ]
+    assert filter_messages(messages, config, self_user_id=LUKASZ) == expected == messages[:1]
+
@@ -1,18 +1,35 @@
 from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
 
 from telegram_voice_transcriber.export_md import MarkdownExporter
 from telegram_voice_transcriber.filters import MessageType
 from telegram_voice_transcriber.models import TranscriptEntry
 
 
-def test_markdown_export_groups_by_day():
-    exporter = MarkdownExporter(
+# The exporter holds no per-render state, so one instance per setup is shared.
+@pytest.fixture(scope="session")
+def vienna_exporter():
+    return MarkdownExporter(
         chat_title="Alice Example",
         year=2025,
         include_message_ids=True,
         timezone_name="Europe/Vienna",
     )
 
+
+@pytest.fixture(scope="session")
+def utc_exporter():
+    return MarkdownExporter(
+        chat_title="Alice Example",
+        year=2025,
+        include_message_ids=False,
+        timezone_name="UTC",
+    )
+
+
+def test_markdown_export_groups_by_day(vienna_exporter):
     entries = [
         TranscriptEntry(
             message_id=10,
@@ -37,7 +54,7 @@ def test_markdown_export_groups_by_day():
         ),
     ]
 
-    rendered = exporter.render(entries)
+    rendered = vienna_exporter.render(entries)
 
     assert "# Transkript – Alice Example (2025)" in rendered
     assert "## 2025-01-05" in rendered
@@ -49,13 +66,7 @@ def test_markdown_export_groups_by_day():
     assert "10:15 – Alice: Vergiss die Tests nicht. [#ID: 12]" in rendered
 
 
-def test_markdown_export_sanitises_markdown():
-    exporter = MarkdownExporter(
-        chat_title="Alice Example",
-        year=2025,
-        include_message_ids=False,
-        timezone_name="UTC",
-    )
+def test_markdown_export_sanitises_markdown(utc_exporter):
     entries = [
         TranscriptEntry(
             message_id=1,
@@ -65,7 +76,126 @@ def test_markdown_export_sanitises_markdown():
             content="Bitte prüfe `code` und *Tests*.",
         )
     ]
-    rendered = exporter.render(entries)
+    rendered = utc_exporter.render(entries)
     assert "`code`" in rendered
     assert "*Tests*" in rendered
     assert "[#ID:" not in rendered
+
+
+class NoConversionDatetime(datetime):
+    def astimezone(self, tz=None):
+        raise AssertionError("UTC timestamps must not be converted for a UTC export")
+
+
+def test_markdown_export_skips_conversion_for_utc(utc_exporter):
+    entries = [
+        TranscriptEntry(
+            message_id=message_id,
+            timestamp=NoConversionDatetime(
+                2025, 2, 1 + message_id // 100, 12, message_id % 60, tzinfo=timezone.utc
+            ),
+            sender_display="Alice",
+            message_type=MessageType.TEXT,
+            content=f"Nachricht {message_id}",
+        )
+        for message_id in range(1000)
+    ]
+
+    rendered = utc_exporter.render(entries)
+
+    assert "## 2025-02-10" in rendered
+    assert "12:39 – Alice: Nachricht 999" in rendered
+    assert MarkdownExporter(
+        chat_title="Alice Example",
+        year=2025,
+        include_message_ids=False,
+        timezone_name="utc",
+    )._tzinfo is timezone.utc
+
+
+def test_markdown_export_orders_unsorted_entries(utc_exporter):
+    entries = [
+        TranscriptEntry(
+            message_id=message_id,
+            timestamp=timestamp,
+            sender_display="Alice",
+            message_type=MessageType.TEXT,
+            content=f"Nachricht {message_id}",
+        )
+        for message_id, timestamp in [
+            (3, datetime(2025, 1, 6, 8, 0, tzinfo=timezone.utc)),
+            (2, datetime(2025, 1, 5, 12, 0, tzinfo=timezone.utc)),
+            (1, datetime(2025, 1, 5, 9, 0, tzinfo=timezone.utc)),
+        ]
+    ]
+
+    rendered = utc_exporter.render(entries)
+
+    assert rendered.index("Nachricht 1") < rendered.index("Nachricht 2")
+    assert rendered.index("Nachricht 2") < rendered.index("## 2025-01-06")
+    assert rendered.index("## 2025-01-06") < rendered.index("Nachricht 3")
+
+
+def test_markdown_export_resolves_timezone_once(utc_exporter):
+    exporter = MarkdownExporter(
+        chat_title="Alice Example",
+        year=2025,
+        include_message_ids=False,
+        timezone_name="Europe/Vienna",
+    )
+    assert isinstance(exporter._tzinfo, ZoneInfo)
+    assert utc_exporter._tzinfo is timezone.utc
+
+    posix = MarkdownExporter(
+        chat_title="Alice Example",
+        year=2025,
+        include_message_ids=False,
+        timezone_name="CET-1",
+    )
+    entry = TranscriptEntry(
+        message_id=1,
+        timestamp=datetime(2025, 1, 5, 8, 30, tzinfo=timezone.utc),
+        sender_display="Alice",
+        message_type=MessageType.TEXT,
+        content="Hallo",
+    )
+    assert "09:30 – Alice: Hallo" in posix.render([entry])
+
+
+def test_markdown_iter_lines_matches_render(vienna_exporter):
+    entries = [
+        TranscriptEntry(
+            message_id=message_id,
+            timestamp=datetime(2025, 1, day, 8, 30, tzinfo=timezone.utc),
+            sender_display="Alice",
+            message_type=MessageType.VOICE,
+            content="Hallo",
+        )
+        for message_id, day in [(1, 5), (2, 6)]
+    ]
+
+    lines = list(vienna_exporter.iter_lines(entries))
+
+    assert all(line.endswith("\n") for line in lines)
+    assert "".join(lines) == vienna_exporter.render(entries)
+
+
+def test_markdown_stream_matches_render(vienna_exporter):
+    entries = [
+        TranscriptEntry(
+            message_id=index,
+            timestamp=datetime(2025, 1, 5 + index // 2, 8 + index, 0, tzinfo=timezone.utc),
+            sender_display="Alice",
+            message_type=MessageType.VOICE if index % 2 else MessageType.TEXT,
+            content=f"Nachricht {index}",
+        )
+        for index in range(5)
+    ]
+
+    streamed = vienna_exporter.render_header()
+    day = None
+    for entry in entries:
+        day, line = vienna_exporter.render_entry(entry, day)
+        streamed += line
+
+    assert streamed == vienna_exporter.render(entries)
@@ -1,6 +1,12 @@
 from types import SimpleNamespace
 
-from telegram_voice_transcriber.filters import MessageType, determine_message_type
+import pytest
+
+from telegram_voice_transcriber.filters import (
+    MessageType,
+    determine_message_type,
+    message_type_from_value,
+)
 
 
 def test_determine_voice_type_from_voice_flag():
@@ -23,3 +29,23 @@ def test_determine_text_when_no_media():
         message="Hallo Alice",
     )
     assert determine_message_type(message) == MessageType.TEXT
+
+
+def test_message_type_from_value_resolves_known_values():
+    assert message_type_from_value("voice") is MessageType.VOICE
+    assert message_type_from_value("video_note") is MessageType.VIDEO_NOTE
+
+    with pytest.raises(ValueError):
+        message_type_from_value("sticker")
+
+
+def test_determine_video_note_from_round_video():
+    message = SimpleNamespace(
+        voice=False,
+        video=object(),
+        round=True,
+        audio=None,
+        media=None,
+        message=None,
+    )
+    assert determine_message_type(message) == MessageType.VIDEO_NOTE
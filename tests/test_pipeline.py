@@ -1,3 +1,9 @@
+import asyncio
+import io
+import json
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime, timezone
 from pathlib import Path
 
@@ -8,7 +14,10 @@ from telegram_voice_transcriber.export_md import MarkdownExporter
 from telegram_voice_transcriber.filters import FilterConfig, MessageType
 from telegram_voice_transcriber.models import MessageEnvelope
 from telegram_voice_transcriber.pipeline import PipelineOptions, ProcessingPipeline
-from telegram_voice_transcriber.state import ProcessingState
+from telegram_voice_transcriber.state import ProcessingState, TranscriptCache
+
+
+_UTC = timezone.utc
 
 
 @pytest.fixture
@@ -17,7 +26,7 @@ def alice_message():
         message_id=101,
         sender_id=123,
         sender_display="Alice",
-        date=datetime(2025, 3, 10, 9, 0, tzinfo=timezone.utc),
+        date=datetime(2025, 3, 10, 9, 0, tzinfo=_UTC),
         message_type=MessageType.VOICE,
         text=None,
     )
@@ -29,12 +38,40 @@ def alice_text_message():
         message_id=102,
         sender_id=123,
         sender_display="Alice",
-        date=datetime(2025, 3, 10, 9, 5, tzinfo=timezone.utc),
+        date=datetime(2025, 3, 10, 9, 5, tzinfo=_UTC),
         message_type=MessageType.TEXT,
         text="Bitte die Tests anpassen.",
     )
 
 
+@pytest.fixture
+def alice_messages(alice_message, alice_text_message) -> tuple[MessageEnvelope, ...]:
+    return (alice_message, alice_text_message)
+
+
+class MemoryState(ProcessingState):
+    """ProcessingState that never touches disk, for tests not about persistence."""
+
+    def flush(self) -> None:
+        pass
+
+
+@pytest.fixture
+def memory_state(tmp_path: Path):
+    # The path is never created, so nothing is loaded either.
+    return MemoryState(tmp_path / "unused" / "state.json")
+
+
+@pytest.fixture(scope="module")
+def exporter_vienna():
+    return MarkdownExporter(
+        chat_title="Alice Example",
+        year=2025,
+        include_message_ids=True,
+        timezone_name="Europe/Vienna",
+    )
+
+
 class StubDownloader:
     def __init__(self, audio_path: Path):
         self.audio_path = audio_path
@@ -60,226 +97,470 @@ class MemoryWriter:
         self.contents: str | None = None
         self.path: Path | None = None
 
-    def write(self, target: Path, content: str) -> None:
+    @contextmanager
+    def open(self, target: Path):
+        buffer = io.StringIO()
+        yield buffer
         self.path = target
-        self.contents = content
-
+        self.contents = buffer.getvalue()
 
-@pytest.mark.asyncio
-async def test_pipeline_creates_dry_run_stats(tmp_path: Path, alice_message):
-    downloader = StubDownloader(tmp_path / "audio.ogg")
-    transcriber = StubTranscriber("Transkription ignoriert")
-    writer = MemoryWriter()
-    exporter = MarkdownExporter(
-        chat_title="Alice Example",
-        year=2025,
-        include_message_ids=True,
-        timezone_name="Europe/Vienna",
-    )
-    dry_run_report = DryRunReport(chat_title="Alice Example", year=2025)
-    state = ProcessingState(tmp_path / "state.json")
 
-    pipeline = ProcessingPipeline(
-        options=PipelineOptions(
-            dry_run=True,
-            output_path=tmp_path / "out.md",
+@pytest.fixture
+def pipeline_factory(tmp_path: Path, exporter_vienna):
+    """Wire pipelines under ``tmp_path``; collaborators not passed in are fresh stubs.
+
+    Keyword arguments other than the ones below go to ``PipelineOptions``. The
+    stubs are reachable through the pipeline (``pipeline.downloader`` and so on).
+    """
+
+    def make(
+        *,
+        filter_types=(MessageType.VOICE, MessageType.TEXT),
+        filter_config=None,
+        preload=(),
+        state=None,
+        downloader=None,
+        transcriber=None,
+        writer=None,
+        on_entry=None,
+        transcript_cache=None,
+        dry_run: bool = False,
+        **options,
+    ) -> ProcessingPipeline:
+        if state is None:
+            state = ProcessingState(tmp_path / "state.json")
+        for message_id in preload:
+            state.record_processed(message_id)
+        state.flush()
+        return ProcessingPipeline(
+            options=PipelineOptions(
+                dry_run=dry_run,
+                output_path=tmp_path / "out.md",
+                **options,
+            ),
+            filter_config=filter_config or FilterConfig(
+                allowed_sender_ids={123},
+                allowed_types=set(filter_types),
+                year=2025,
+                include_self=False,
+            ),
+            exporter=exporter_vienna,
+            dry_run_report=DryRunReport(chat_title="Alice Example", year=2025),
+            downloader=downloader or StubDownloader(tmp_path / "audio.ogg"),
+            transcriber=transcriber or StubTranscriber("Bitte implementiere das Feature."),
+            writer=writer or MemoryWriter(),
+            state=state,
+            on_entry=on_entry,
+            transcript_cache=transcript_cache,
+        )
+
+    return make
+
+
+def voice_messages(first_id: int, count: int) -> list[MessageEnvelope]:
+    """``count`` voice messages from Alice, one minute apart."""
+    return [
+        MessageEnvelope(
+            message_id=first_id + index,
+            sender_id=123,
+            sender_display="Alice",
+            date=datetime(2025, 3, 10, 9, index, tzinfo=_UTC),
+            message_type=MessageType.VOICE,
+        )
+        for index in range(count)
+    ]
+
+
+@pytest.mark.parametrize(
+    "dry_run,filter_types,state_preload,expected_total,expected_types,expected_downloads,expected_texts",
+    [
+        pytest.param(
+            True,
+            {MessageType.VOICE, MessageType.TEXT},
+            (),
+            2,
+            {MessageType.VOICE: 1, MessageType.TEXT: 1},
+            [],
+            None,
+            id="dry_run_basic",
         ),
-        filter_config=FilterConfig(
-            allowed_sender_ids={123},
-            allowed_types={MessageType.VOICE, MessageType.TEXT},
-            year=2025,
-            include_self=False,
+        pytest.param(
+            True,
+            {MessageType.VOICE},
+            (),
+            1,
+            {MessageType.VOICE: 1},
+            [],
+            None,
+            id="dry_run_filters_text",
         ),
-        exporter=exporter,
-        dry_run_report=dry_run_report,
-        downloader=downloader,
-        transcriber=transcriber,
-        writer=writer,
-        state=state,
+        pytest.param(
+            False,
+            {MessageType.VOICE, MessageType.TEXT},
+            (),
+            2,
+            {MessageType.VOICE: 1, MessageType.TEXT: 1},
+            [101],
+            ["Bitte implementiere das Feature.", "Bitte die Tests anpassen."],
+            id="full_run_both",
+        ),
+        pytest.param(
+            False,
+            {MessageType.VOICE, MessageType.TEXT},
+            (101,),
+            1,
+            {MessageType.TEXT: 1},
+            [],
+            ["Bitte die Tests anpassen."],
+            id="skip_processed",
+        ),
+    ],
+)
+async def test_pipeline_run(
+    tmp_path: Path,
+    alice_messages,
+    pipeline_factory,
+    dry_run,
+    filter_types,
+    state_preload,
+    expected_total,
+    expected_types,
+    expected_downloads,
+    expected_texts,
+):
+    pipeline = pipeline_factory(
+        dry_run=dry_run,
+        filter_types=filter_types,
+        preload=state_preload,
     )
+    downloader, transcriber, writer = pipeline.downloader, pipeline.transcriber, pipeline.writer
+
+    result = await pipeline.run(alice_messages)
+
+    total = result.total_messages if dry_run else result.processed_messages
+    assert total == expected_total
+    assert dict(result.type_counts) == expected_types
+    # Downloads run concurrently, so only the set of messages (each fetched once) is fixed.
+    assert sorted(downloader.called_with) == expected_downloads
+    assert transcriber.called_paths == [tmp_path / "audio.ogg"] * len(expected_downloads)
+    if expected_texts is None:
+        assert writer.contents is None
+    else:
+        assert writer.path == tmp_path / "out.md"
+        for text in expected_texts:
+            assert text in writer.contents
+        assert ("Bitte implementiere das Feature." in writer.contents) is bool(expected_downloads)
+    # Dry runs leave the persisted state as it was; full runs record every handled message.
+    expected_processed = set(state_preload)
+    if not dry_run:
+        expected_processed |= {message.message_id for message in alice_messages}
+    assert ProcessingState(tmp_path / "state.json").processed_ids == expected_processed
+
+
+async def test_pipeline_logs_each_message(
+    alice_messages,
+    caplog,
+    memory_state,
+    pipeline_factory,
+):
+    pipeline = pipeline_factory(state=memory_state)
+
+    caplog.set_level("INFO", logger="telegram_voice_transcriber.pipeline")
+
+    await pipeline.run(alice_messages)
 
-    stats = await pipeline.run(iter([alice_message]))
+    text = caplog.text
+    assert "Processing 2025-03-10 09:00 VOICE #101" in text
+    assert "Processing 2025-03-10 09:05 TEXT #102" in text
 
-    assert stats.total_messages == 1
-    assert stats.type_counts[MessageType.VOICE] == 1
-    assert downloader.called_with == []
-    assert transcriber.called_paths == []
-    assert writer.contents is None
-    # State must remain untouched in dry-run.
-    assert state.has_processed(alice_message.message_id) is False
 
+async def test_pipeline_reports_entries_as_they_are_produced(alice_messages, pipeline_factory):
+    received = []
+    pipeline = pipeline_factory(on_entry=received.append)
 
-@pytest.mark.asyncio
-async def test_pipeline_dry_run_ignores_filtered_messages(tmp_path: Path, alice_message, alice_text_message):
-    downloader = StubDownloader(tmp_path / "audio.ogg")
-    transcriber = StubTranscriber("Ignoriert")
-    writer = MemoryWriter()
-    exporter = MarkdownExporter(
-        chat_title="Alice Example",
-        year=2025,
-        include_message_ids=True,
-        timezone_name="Europe/Vienna",
-    )
-    dry_run_report = DryRunReport(chat_title="Alice Example", year=2025)
-    state = ProcessingState(tmp_path / "state.json")
+    await pipeline.run(alice_messages)
 
-    pipeline = ProcessingPipeline(
-        options=PipelineOptions(
-            dry_run=True,
-            output_path=tmp_path / "out.md",
-        ),
-        filter_config=FilterConfig(
-            allowed_sender_ids={123},
-            allowed_types={MessageType.VOICE},
-            year=2025,
-            include_self=False,
-        ),
-        exporter=exporter,
-        dry_run_report=dry_run_report,
-        downloader=downloader,
-        transcriber=transcriber,
-        writer=writer,
-        state=state,
-    )
+    assert [entry.message_id for entry in received] == [101, 102]
+    assert received[0].content == "Bitte implementiere das Feature."
 
-    stats = await pipeline.run(iter([alice_message, alice_text_message]))
 
-    assert stats.total_messages == 1
-    assert stats.type_counts[MessageType.VOICE] == 1
-    assert MessageType.TEXT not in stats.type_counts
+class ConcurrencyTrackingDownloader:
+    def __init__(self, audio_path: Path):
+        self.audio_path = audio_path
+        self.in_flight = 0
+        self.max_in_flight = 0
 
+    async def download(self, message: MessageEnvelope) -> Path:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        return self.audio_path
 
-@pytest.mark.asyncio
-async def test_pipeline_processes_audio_and_text(tmp_path: Path, alice_message, alice_text_message):
-    audio_path = tmp_path / "audio.ogg"
-    audio_path.write_bytes(b"fake")
-    downloader = StubDownloader(audio_path)
-    transcriber = StubTranscriber("Bitte implementiere das Feature.")
-    writer = MemoryWriter()
-    exporter = MarkdownExporter(
-        chat_title="Alice Example",
-        year=2025,
-        include_message_ids=True,
-        timezone_name="Europe/Vienna",
+
+async def test_pipeline_downloads_media_concurrently(tmp_path: Path, pipeline_factory):
+    downloader = ConcurrencyTrackingDownloader(tmp_path / "audio.ogg")
+    pipeline = pipeline_factory(downloader=downloader, download_concurrency=3)
+
+    summary = await pipeline.run(voice_messages(200, 6))
+
+    assert summary.processed_messages == 6
+    assert downloader.max_in_flight == 3
+
+
+class CountingDownloader:
+    def __init__(self, audio_path: Path):
+        self.audio_path = audio_path
+        self.completed = 0
+
+    async def download(self, message: MessageEnvelope) -> Path:
+        await asyncio.sleep(0.01)
+        self.completed += 1
+        return self.audio_path
+
+
+class SlowTranscriber:
+    def __init__(self, downloader: CountingDownloader):
+        self.downloader = downloader
+        self.completed_at_call = []
+
+    def transcribe(self, audio_path: Path) -> str:
+        self.completed_at_call.append(self.downloader.completed)
+        time.sleep(0.1)
+        return "Hallo"
+
+
+async def test_pipeline_overlaps_downloads_with_transcription(tmp_path: Path, pipeline_factory):
+    downloader = CountingDownloader(tmp_path / "audio.ogg")
+    transcriber = SlowTranscriber(downloader)
+    pipeline = pipeline_factory(
+        downloader=downloader, transcriber=transcriber, download_concurrency=1
     )
-    dry_run_report = DryRunReport(chat_title="Alice Example", year=2025)
-    state = ProcessingState(tmp_path / "state.json")
 
-    pipeline = ProcessingPipeline(
-        options=PipelineOptions(
-            dry_run=False,
-            output_path=tmp_path / "out.md",
-        ),
+    await pipeline.run(voice_messages(300, 3))
+
+    # The remaining downloads finished while the first clip was being transcribed.
+    assert transcriber.completed_at_call[1] == 3
+
+
+async def test_pipeline_skips_filter_for_pre_filtered_messages(alice_messages, pipeline_factory):
+    pipeline = pipeline_factory(
+        # Would reject both messages if it were applied.
         filter_config=FilterConfig(
-            allowed_sender_ids={123},
-            allowed_types={MessageType.VOICE, MessageType.TEXT},
-            year=2025,
+            allowed_sender_ids={999},
+            allowed_types=set(),
+            year=2024,
             include_self=False,
         ),
-        exporter=exporter,
-        dry_run_report=dry_run_report,
-        downloader=downloader,
-        transcriber=transcriber,
-        writer=writer,
-        state=state,
+        pre_filtered=True,
     )
 
-    summary = await pipeline.run(iter([alice_message, alice_text_message]))
+    summary = await pipeline.run(alice_messages)
 
     assert summary.processed_messages == 2
-    assert summary.type_counts[MessageType.VOICE] == 1
-    assert summary.type_counts[MessageType.TEXT] == 1
-    assert downloader.called_with == [alice_message.message_id]
-    assert transcriber.called_paths == [audio_path]
-    assert writer.path == tmp_path / "out.md"
-    assert "Bitte implementiere das Feature." in writer.contents
-    assert "Bitte die Tests anpassen." in writer.contents
-    assert state.has_processed(alice_message.message_id) is True
-    assert state.has_processed(alice_text_message.message_id) is True
-
-
-@pytest.mark.asyncio
-async def test_pipeline_logs_each_message(tmp_path: Path, alice_message, alice_text_message, caplog):
-    audio_path = tmp_path / "audio.ogg"
-    audio_path.write_bytes(b"fake")
-    downloader = StubDownloader(audio_path)
-    transcriber = StubTranscriber("Bitte implementiere das Feature.")
-    writer = MemoryWriter()
-    exporter = MarkdownExporter(
-        chat_title="Alice Example",
-        year=2025,
-        include_message_ids=True,
-        timezone_name="Europe/Vienna",
-    )
-    dry_run_report = DryRunReport(chat_title="Alice Example", year=2025)
-    state = ProcessingState(tmp_path / "state.json")
 
-    pipeline = ProcessingPipeline(
-        options=PipelineOptions(
-            dry_run=False,
-            output_path=tmp_path / "out.md",
-        ),
-        filter_config=FilterConfig(
-            allowed_sender_ids={123},
-            allowed_types={MessageType.VOICE, MessageType.TEXT},
-            year=2025,
-            include_self=False,
-        ),
-        exporter=exporter,
-        dry_run_report=dry_run_report,
-        downloader=downloader,
+
+async def test_pipeline_limits_downloads_ahead_of_transcription(tmp_path: Path, pipeline_factory):
+    downloader = CountingDownloader(tmp_path / "audio.ogg")
+    transcriber = SlowTranscriber(downloader)
+    pipeline = pipeline_factory(downloader=downloader, transcriber=transcriber, prefetch=1)
+
+    summary = await pipeline.run(voice_messages(400, 4))
+
+    assert summary.processed_messages == 4
+    # The download being transcribed plus one prefetched behind it.
+    assert transcriber.completed_at_call[0] <= 2
+
+
+class ParallelTrackingTranscriber:
+    def __init__(self):
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def transcribe(self, audio_path: Path) -> str:
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        # Later messages finish first, so ordering has to come from the pipeline.
+        time.sleep(0.05 if audio_path.stem.endswith("0") else 0.01)
+        with self.lock:
+            self.active -= 1
+        return audio_path.stem
+
+
+class PerMessageDownloader:
+    def __init__(self, base_dir: Path):
+        self.base_dir = base_dir
+
+    async def download(self, message: MessageEnvelope) -> Path:
+        return self.base_dir / f"clip{message.message_id}.ogg"
+
+
+async def test_pipeline_transcribes_concurrently_in_order(tmp_path: Path, pipeline_factory):
+    transcriber = ParallelTrackingTranscriber()
+    reported: list[int] = []
+    pipeline = pipeline_factory(
+        downloader=PerMessageDownloader(tmp_path),
         transcriber=transcriber,
-        writer=writer,
-        state=state,
+        on_entry=lambda entry: reported.append(entry.message_id),
+        transcribe_concurrency=2,
     )
 
-    caplog.set_level("INFO", logger="telegram_voice_transcriber.pipeline")
+    summary = await pipeline.run(voice_messages(500, 4))
 
-    await pipeline.run(iter([alice_message, alice_text_message]))
+    assert summary.processed_messages == 4
+    assert transcriber.max_active == 2
+    assert reported == [500, 501, 502, 503]
+    positions = [pipeline.writer.contents.index(f"clip{500 + index}") for index in range(4)]
+    assert positions == sorted(positions)
 
-    text = caplog.text
-    assert "Processing 2025-03-10 09:00 VOICE #101" in text
-    assert "Processing 2025-03-10 09:05 TEXT #102" in text
 
+class BatchRecordingTranscriber:
+    def __init__(self, fail_batches: bool = False):
+        self.batches = []
+        self.single_calls = 0
+        self.fail_batches = fail_batches
 
-@pytest.mark.asyncio
-async def test_pipeline_skips_already_processed(tmp_path: Path, alice_message, alice_text_message):
-    audio_path = tmp_path / "audio.ogg"
-    audio_path.write_bytes(b"fake")
-    downloader = StubDownloader(audio_path)
-    transcriber = StubTranscriber("Bitte implementiere das Feature.")
-    writer = MemoryWriter()
-    exporter = MarkdownExporter(
-        chat_title="Alice Example",
-        year=2025,
-        include_message_ids=True,
-        timezone_name="Europe/Vienna",
+    def transcribe(self, audio_path: Path) -> str:
+        self.single_calls += 1
+        return f"einzeln {audio_path.stem}"
+
+    def transcribe_batch(self, audio_paths: list[Path]) -> list[str]:
+        self.batches.append([path.stem for path in audio_paths])
+        if self.fail_batches:
+            raise RuntimeError("out of memory")
+        return [f"stapel {path.stem}" for path in audio_paths]
+
+
+def batching_messages() -> list[MessageEnvelope]:
+    types = [MessageType.VOICE, MessageType.TEXT, MessageType.VOICE, MessageType.VOICE, MessageType.VOICE, MessageType.VOICE]
+    return [
+        MessageEnvelope(
+            message_id=600 + index,
+            sender_id=123,
+            sender_display="Alice",
+            date=datetime(2025, 3, 10, 9, index, tzinfo=_UTC),
+            message_type=message_type,
+            text="Dazwischen" if message_type is MessageType.TEXT else None,
+        )
+        for index, message_type in enumerate(types)
+    ]
+
+
+async def test_pipeline_transcribes_audio_in_batches(tmp_path: Path, pipeline_factory):
+    transcriber = BatchRecordingTranscriber()
+    pipeline = pipeline_factory(
+        downloader=PerMessageDownloader(tmp_path), transcriber=transcriber, transcribe_batch=2
     )
-    dry_run_report = DryRunReport(chat_title="Alice Example", year=2025)
-    state = ProcessingState(tmp_path / "state.json")
-    state.record_processed(alice_message.message_id)
-
-    pipeline = ProcessingPipeline(
-        options=PipelineOptions(
-            dry_run=False,
-            output_path=tmp_path / "out.md",
-        ),
-        filter_config=FilterConfig(
-            allowed_sender_ids={123},
-            allowed_types={MessageType.VOICE, MessageType.TEXT},
-            year=2025,
-            include_self=False,
-        ),
-        exporter=exporter,
-        dry_run_report=dry_run_report,
-        downloader=downloader,
-        transcriber=transcriber,
-        writer=writer,
-        state=state,
+
+    summary = await pipeline.run(batching_messages())
+
+    assert summary.processed_messages == 6
+    assert transcriber.batches == [["clip600", "clip602"], ["clip603", "clip604"]]
+    assert transcriber.single_calls == 1
+    lines = pipeline.writer.contents.splitlines()
+    assert [line.split(": ", 1)[1] for line in lines if ": " in line] == [
+        "stapel clip600 (voice) [#ID: 600]",
+        "Dazwischen [#ID: 601]",
+        "stapel clip602 (voice) [#ID: 602]",
+        "stapel clip603 (voice) [#ID: 603]",
+        "stapel clip604 (voice) [#ID: 604]",
+        "einzeln clip605 (voice) [#ID: 605]",
+    ]
+
+
+async def test_pipeline_retries_failed_batches_per_message(tmp_path: Path, pipeline_factory):
+    transcriber = BatchRecordingTranscriber(fail_batches=True)
+    pipeline = pipeline_factory(
+        downloader=PerMessageDownloader(tmp_path), transcriber=transcriber, transcribe_batch=2
+    )
+
+    summary = await pipeline.run(batching_messages())
+
+    assert summary.processed_messages == 6
+    assert transcriber.single_calls == 5
+    assert "stapel" not in pipeline.writer.contents
+
+
+def test_pipeline_options_derive_prefetch_depth(tmp_path: Path):
+    options = PipelineOptions(
+        dry_run=False,
+        output_path=tmp_path / "out.md",
+        transcribe_concurrency=2,
+        transcribe_batch=16,
     )
 
-    summary = await pipeline.run(iter([alice_message, alice_text_message]))
+    assert options.prefetch_depth == 48
+    assert PipelineOptions(dry_run=False, output_path=tmp_path / "out.md").prefetch_depth == 8
+    assert PipelineOptions(dry_run=False, output_path=tmp_path / "out.md", prefetch=3).prefetch_depth == 3
+
+
+async def test_pipeline_runs_whisper_on_its_own_executor(alice_message, pipeline_factory):
+    class ThreadRecordingTranscriber:
+        def __init__(self):
+            self.threads = []
+
+        def transcribe(self, audio_path: Path) -> str:
+            self.threads.append(threading.current_thread().name)
+            return "Hallo"
+
+    transcriber = ThreadRecordingTranscriber()
+    pipeline = pipeline_factory(transcriber=transcriber)
+
+    try:
+        await pipeline.run([alice_message])
+    finally:
+        pipeline.close()
+
+    assert transcriber.threads[0].startswith("transcribe")
+    assert pipeline._executor is None
+
+
+async def test_pipeline_reuses_transcripts_of_identical_audio(tmp_path: Path, pipeline_factory):
+    # 700 and 702 are the same forwarded recording.
+    for index, payload in enumerate([b"sprachnachricht", b"andere", b"sprachnachricht"]):
+        (tmp_path / f"clip{700 + index}.ogg").write_bytes(payload)
+
+    class CountingTranscriber:
+        def __init__(self):
+            self.calls = []
+
+        def transcribe(self, audio_path: Path) -> str:
+            self.calls.append(audio_path.stem)
+            return f"Text {audio_path.stem}"
+
+    transcriber = CountingTranscriber()
+    pipeline = pipeline_factory(
+        downloader=PerMessageDownloader(tmp_path),
+        transcriber=transcriber,
+        transcript_cache=TranscriptCache(tmp_path / "transcript_cache.json", namespace="small/de"),
+    )
 
-    assert summary.processed_messages == 1
-    assert MessageType.VOICE not in summary.type_counts
-    assert summary.type_counts[MessageType.TEXT] == 1
+    try:
+        await pipeline.run(voice_messages(700, 3))
+    finally:
+        pipeline.close()
+
+    assert transcriber.calls == ["clip700", "clip701"]
+    assert "Text clip700 (voice) [#ID: 702]" in pipeline.writer.contents
+    assert (tmp_path / "transcript_cache.json").exists()
+
+
+async def test_pipeline_writes_progress_events(tmp_path: Path, alice_messages, pipeline_factory):
+    events_path = tmp_path / "events" / "run.jsonl"
+    pipeline = pipeline_factory(events_path=events_path)
+
+    try:
+        await pipeline.run(alice_messages)
+    finally:
+        pipeline.close()
+
+    events = [json.loads(line) for line in events_path.read_text(encoding="utf-8").splitlines()]
+    assert [(event["event"], event.get("id")) for event in events] == [
+        ("chunk_done", 101),
+        ("chunk_done", 102),
+        ("transcribe_finished", None),
+    ]
+    assert events[0]["type"] == "VOICE"
+    assert events[-1]["processed"] == 2
@@ -1,6 +1,15 @@
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-from telegram_voice_transcriber.state import ProcessingState
+import pytest
+
+from telegram_voice_transcriber.state import (
+    BloomProcessingState,
+    ProcessingState,
+    TranscriptCache,
+    open_state,
+)
 
 
 def test_state_records_and_checks_ids(tmp_path: Path):
@@ -22,8 +31,7 @@ def test_state_respects_max_history(tmp_path: Path):
     state_file = tmp_path / "state.json"
     state = ProcessingState(state_path=state_file, max_history=3)
 
-    for msg_id in range(1, 6):
-        state.record_processed(msg_id)
+    state.record_processed_many(range(1, 6))
     state.flush()
 
     reloaded = ProcessingState(state_path=state_file, max_history=3)
@@ -31,3 +39,175 @@ def test_state_respects_max_history(tmp_path: Path):
     assert reloaded.has_processed(3) is True
     assert reloaded.has_processed(4) is True
     assert reloaded.has_processed(6) is False
+
+
+def test_state_round_trips_without_orjson(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr("telegram_voice_transcriber.state.orjson", None)
+    state_file = tmp_path / "state.json"
+    state = ProcessingState(state_path=state_file)
+
+    state.record_processed(7)
+    state.flush()
+
+    assert ProcessingState(state_path=state_file).has_processed(7) is True
+
+
+def test_state_starts_fresh_when_file_is_corrupt(tmp_path: Path):
+    state_file = tmp_path / "state.json"
+    state_file.write_bytes(b"\xff{not json")
+
+    assert ProcessingState(state_path=state_file).has_processed(7) is False
+
+
+def test_state_exposes_processed_ids_snapshot(tmp_path: Path):
+    state = ProcessingState(state_path=tmp_path / "state.json")
+    state.record_processed(7)
+
+    snapshot = state.processed_ids
+    state.record_processed(8)
+
+    assert snapshot == frozenset({7})
+    assert state.processed_ids == frozenset({7, 8})
+
+
+def test_bloom_state_round_trips(tmp_path: Path):
+    state_file = tmp_path / "state.json"
+    state = open_state(state_file, "bloom")
+
+    state.record_processed(1)
+    state.record_processed_many(range(2, 5001))
+    state.flush()
+
+    reloaded = BloomProcessingState(state_path=state_file)
+    assert all(reloaded.has_processed(msg_id) for msg_id in range(1, 5001))
+    assert 1 in reloaded.processed_ids
+    assert sum(reloaded.has_processed(msg_id) for msg_id in range(10001, 20001)) < 10
+
+
+def test_bloom_state_imports_exact_history(tmp_path: Path):
+    state_file = tmp_path / "state.json"
+    state = ProcessingState(state_path=state_file)
+    state.record_processed(42)
+    state.flush()
+    state.record_processed(44)
+    state.flush()
+    assert state.log_path.exists()  # 44 is only in the log, not the snapshot
+
+    bloom = BloomProcessingState(state_path=state_file)
+
+    assert bloom.has_processed(42) is True
+    assert bloom.has_processed(44) is True
+    assert bloom.has_processed(43) is False
+
+
+def test_bloom_state_warns_about_mismatched_filter(tmp_path: Path, caplog):
+    state_file = tmp_path / "state.json"
+    state = BloomProcessingState(state_path=state_file, bits=1024)
+    state.record_processed(42)
+    state.flush()
+
+    with caplog.at_level("WARNING", logger="telegram_voice_transcriber.state"):
+        reloaded = BloomProcessingState(state_path=state_file, bits=2048)
+
+    assert reloaded.has_processed(42) is False
+    assert "bits=1024" in caplog.text
+
+
+def test_bloom_state_rejects_partial_bytes(tmp_path: Path):
+    with pytest.raises(ValueError):
+        BloomProcessingState(state_path=tmp_path / "state.json", bits=1001)
+
+
+def test_state_flush_syncs_before_replacing(tmp_path: Path, monkeypatch):
+    import os
+
+    synced = []
+    real_fsync = os.fsync
+    monkeypatch.setattr(
+        "telegram_voice_transcriber.state.os.fsync",
+        lambda fd: synced.append(fd) or real_fsync(fd),
+    )
+    state = ProcessingState(state_path=tmp_path / "state.json")
+
+    state.record_processed(7)
+    state.flush()
+
+    assert len(synced) == 3  # the log, the compacted snapshot, then its directory entry
+    assert not (tmp_path / "state.tmp").exists()
+
+
+def test_state_appends_new_ids_to_log(tmp_path: Path):
+    state_file = tmp_path / "state.json"
+    state = ProcessingState(state_path=state_file)
+    for msg_id in range(1, 101):
+        state.record_processed(msg_id)
+    state.flush()
+    snapshot = state_file.read_bytes()
+
+    state.record_processed(101)
+    state.flush()
+
+    assert state_file.read_bytes() == snapshot
+    assert state.log_path.read_bytes() == b"101\n"
+    assert ProcessingState(state_path=state_file).has_processed(101) is True
+
+
+def test_state_ignores_truncated_log_line(tmp_path: Path):
+    state_file = tmp_path / "state.json"
+    state_file.with_suffix(".log").write_bytes(b"5\n6\n7x")
+
+    reloaded = ProcessingState(state_path=state_file, max_history=1)
+
+    assert reloaded.processed_ids == frozenset({6})
+
+
+def test_state_snapshot_is_compact(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr("telegram_voice_transcriber.state.orjson", None)
+    state_file = tmp_path / "state.json"
+    state = ProcessingState(state_path=state_file)
+
+    state.record_processed(1)
+    state.record_processed(2)
+    state.flush()
+
+    assert state_file.read_bytes() == b'{"processed_ids":[1,2]}'
+
+
+def test_transcript_cache_round_trips_per_namespace(tmp_path: Path):
+    cache_file = tmp_path / "transcript_cache.json"
+    cache = TranscriptCache(cache_file, namespace="small/de", max_entries=2)
+
+    cache.put("aaa", "Hallo")
+    cache.put("bbb", "Welt")
+    cache.put("ccc", "Tschüss")
+    cache.flush()
+
+    reloaded = TranscriptCache(cache_file, namespace="small/de")
+    assert reloaded.get("aaa") is None
+    assert reloaded.get("ccc") == "Tschüss"
+    assert TranscriptCache(cache_file, namespace="medium/de").get("ccc") is None
+
+
+def test_transcript_cache_tolerates_concurrent_writers(tmp_path: Path):
+    cache = TranscriptCache(tmp_path / "cache.json", max_entries=8)
+
+    def fill(worker: int) -> None:
+        for index in range(2000):
+            cache.put(f"{worker}-{index}", "Text")
+            cache.get(f"{worker}-{index - 1}")
+
+    # Switch threads as often as possible so unsynchronised evictions collide.
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            futures = [pool.submit(fill, worker) for worker in range(4)]
+            while not all(future.done() for future in futures):
+                cache.flush()
+            for future in futures:
+                future.result()  # re-raises a KeyError from a racing eviction
+    finally:
+        sys.setswitchinterval(interval)
+    cache.flush()
+
+    assert len(TranscriptCache(tmp_path / "cache.json")._entries) == 8
@@ -9,6 +9,12 @@ from telegram_voice_transcriber.models import MessageEnvelope
 from telegram_voice_transcriber.tg_client import TelegramCollector
 
 
+_UTC = timezone.utc
+_DEFAULT_DATE = datetime(2025, 1, 1, tzinfo=_UTC)
+_ME = SimpleNamespace(id=67890, first_name="Lukasz")
+_CHAT = SimpleNamespace(id=12345, title="Alice Example")
+
+
 class FakeMessage:
     def __init__(self, message_id, sender_id, text=None, voice=False, date=None):
         self.id = message_id
@@ -19,7 +25,7 @@ class FakeMessage:
         self.round = False
         self.video_note = False
         self.audio = None
-        self.date = date or datetime(2025, 1, 1, tzinfo=timezone.utc)
+        self.date = date or _DEFAULT_DATE
 
     async def get_sender(self):
         return SimpleNamespace(id=self.sender_id, first_name="Alice", last_name=None)
@@ -30,10 +36,12 @@ class FakeClient:
         self._messages = messages
 
     async def get_me(self):
-        return SimpleNamespace(id=67890, first_name="Lukasz")
+        return _ME
 
     async def get_entity(self, chat_identifier):
-        return SimpleNamespace(id=12345, title="Alice Example")
+        if isinstance(chat_identifier, list):
+            return [SimpleNamespace(id=user_id, first_name="Alice", last_name=None) for user_id in chat_identifier]
+        return _CHAT
 
     def iter_messages(self, entity, limit=None, reverse=False, offset_date=None):
         async def generator():
@@ -43,66 +51,79 @@ class FakeClient:
         return generator()
 
 
-@pytest.mark.asyncio
-async def test_collector_builds_envelopes():
-    messages = [
-        FakeMessage(1, 12345, text="Hallo", date=datetime(2025, 1, 2, tzinfo=timezone.utc)),
-        FakeMessage(2, 12345, voice=True, date=datetime(2025, 1, 3, tzinfo=timezone.utc)),
-    ]
-    client = FakeClient(messages)
-    collector = TelegramCollector(client)
-    filter_config = FilterConfig(
-        allowed_sender_ids={12345},
-        allowed_types={MessageType.TEXT, MessageType.VOICE},
-        year=2025,
-        include_self=False,
-    )
+class CountingClient(FakeClient):
+    def __init__(self, messages):
+        super().__init__(messages)
+        self.lookups = []
 
-    result = await collector.collect(
-        chat_identifier="Alice Example",
-        filter_config=filter_config,
-        since=datetime(2025, 1, 1, tzinfo=timezone.utc),
-        until=datetime(2025, 12, 31, tzinfo=timezone.utc),
-    )
+    async def get_entity(self, chat_identifier):
+        self.lookups.append(chat_identifier)
+        return await super().get_entity(chat_identifier)
 
-    assert result.self_user_id == 67890
-    assert result.chat_title == "Alice Example"
-    assert isinstance(result.messages, list)
-    assert len(result.messages) == 2
-    assert all(isinstance(msg, MessageEnvelope) for msg in result.messages)
 
-    voice_message = next(msg for msg in result.messages if msg.message_id == 2)
-    assert voice_message.message_type is MessageType.VOICE
-    assert voice_message.sender_display == "Alice"
+def utc(*args):
+    return datetime(*args, tzinfo=_UTC)
 
 
-@pytest.mark.asyncio
-async def test_collector_filters_within_dates():
-    messages = [
-        FakeMessage(1, 12345, text="Alt", date=datetime(2025, 1, 31, tzinfo=timezone.utc)),
-        FakeMessage(2, 12345, text="Innen", date=datetime(2025, 2, 1, 9, 0, tzinfo=timezone.utc)),
-        FakeMessage(3, 12345, text="Nach", date=datetime(2025, 3, 1, tzinfo=timezone.utc)),
-    ]
-    client = FakeClient(messages)
-    collector = TelegramCollector(client)
+_MESSAGES_BUILD_ENVELOPES = [
+    FakeMessage(1, 12345, text="Hallo", date=utc(2025, 1, 2)),
+    FakeMessage(2, 12345, voice=True, date=utc(2025, 1, 3)),
+]
+_MESSAGES_WITHIN_DATES = [
+    FakeMessage(1, 12345, text="Alt", date=utc(2025, 1, 31)),
+    FakeMessage(2, 12345, text="Innen", date=utc(2025, 2, 1, 9, 0)),
+    FakeMessage(3, 12345, text="Nach", date=utc(2025, 3, 1)),
+]
+
+
+@pytest.mark.parametrize(
+    "messages,allowed_types,since,until,expected_ids",
+    [
+        pytest.param(
+            _MESSAGES_BUILD_ENVELOPES,
+            {MessageType.TEXT, MessageType.VOICE},
+            utc(2025, 1, 1),
+            utc(2025, 12, 31),
+            [1, 2],
+            id="builds_envelopes",
+        ),
+        pytest.param(
+            _MESSAGES_WITHIN_DATES,
+            {MessageType.TEXT},
+            utc(2025, 2, 1),
+            utc(2025, 3, 1),
+            [2],
+            id="within_dates",
+        ),
+    ],
+)
+async def test_collector(messages, allowed_types, since, until, expected_ids):
     filter_config = FilterConfig(
         allowed_sender_ids={12345},
-        allowed_types={MessageType.TEXT},
+        allowed_types=allowed_types,
         year=2025,
         include_self=False,
     )
 
-    result = await collector.collect(
+    result = await TelegramCollector(FakeClient(messages)).collect(
         chat_identifier="Alice Example",
         filter_config=filter_config,
-        since=datetime(2025, 2, 1, tzinfo=timezone.utc),
-        until=datetime(2025, 3, 1, tzinfo=timezone.utc),
+        since=since,
+        until=until,
     )
 
-    assert [msg.message_id for msg in result.messages] == [2]
+    assert result.self_user_id == 67890
+    assert result.chat_title == "Alice Example"
+    assert result.sender_ids == {12345}
+    assert isinstance(result.messages, list)
+    assert [msg.message_id for msg in result.messages] == expected_ids
+    assert all(isinstance(msg, MessageEnvelope) for msg in result.messages)
+    assert all(msg.sender_display == "Alice" for msg in result.messages)
+    for msg in result.messages:
+        # Only media keeps the Telethon message around for the download.
+        assert (msg.raw_message is not None) is (msg.message_type is MessageType.VOICE)
 
 
-@pytest.mark.asyncio
 async def test_list_dialogs_returns_chat_list():
     from unittest.mock import MagicMock
 
@@ -132,3 +153,123 @@ async def test_list_dialogs_returns_chat_list():
     assert dialogs[0]["name"] == "Alice"
     assert dialogs[0]["id"] == 123
     assert dialogs[1]["name"] == "Work Group"
+
+
+async def test_collector_applies_message_filter():
+    messages = [
+        FakeMessage(1, 12345, text="Hallo", date=utc(2025, 1, 2)),
+        FakeMessage(2, 12345, voice=True, date=utc(2025, 1, 3)),
+        FakeMessage(3, 67890, voice=True, date=utc(2025, 1, 4)),
+    ]
+    collector = TelegramCollector(FakeClient(messages))
+    filter_config = FilterConfig(
+        allowed_sender_ids=None,
+        allowed_types={MessageType.VOICE},
+        year=None,
+        include_self=False,
+    )
+
+    result = await collector.collect(
+        chat_identifier="Alice Example",
+        filter_config=filter_config,
+        since=utc(2025, 1, 1),
+        until=utc(2025, 12, 31),
+    )
+
+    assert [msg.message_id for msg in result.messages] == [2]
+
+
+async def test_collector_resolves_unknown_senders_in_one_request():
+    messages = [
+        FakeMessage(message_id, sender_id, text="Hallo", date=utc(2025, 1, message_id))
+        for message_id, sender_id in ((1, 111), (2, 222), (3, 111))
+    ]
+    client = CountingClient(messages)
+    filter_config = FilterConfig(
+        allowed_sender_ids=None,
+        allowed_types={MessageType.TEXT},
+        year=None,
+        include_self=True,
+    )
+
+    result = await TelegramCollector(client).collect(
+        chat_identifier="Alice Example",
+        filter_config=filter_config,
+        since=utc(2025, 1, 1),
+        until=utc(2025, 12, 31),
+    )
+
+    assert client.lookups[1:] == [[111, 222]]
+    assert [msg.sender_display for msg in result.messages] == ["Alice", "Alice", "Alice"]
+
+
+async def test_collector_only_resolves_senders_of_kept_messages():
+    messages = [
+        FakeMessage(message_id, sender_id, text="Hallo", date=utc(2025, 1, message_id))
+        for message_id, sender_id in ((1, 111), (2, 222), (3, 67890))
+    ]
+    client = CountingClient(messages)
+    filter_config = FilterConfig(
+        allowed_sender_ids={111},
+        allowed_types={MessageType.TEXT},
+        year=None,
+        include_self=False,
+    )
+
+    result = await TelegramCollector(client).collect(
+        chat_identifier="Alice Example",
+        filter_config=filter_config,
+    )
+
+    assert [msg.message_id for msg in result.messages] == [1]
+    assert client.lookups[1:] == [[111]]
+
+
+async def test_collector_returns_messages_oldest_first():
+    messages = [
+        FakeMessage(1, 12345, text="Eins", date=utc(2025, 1, 2)),
+        FakeMessage(2, 12345, text="Zwei", date=utc(2025, 1, 3)),
+        FakeMessage(3, 12345, text="Drei", date=utc(2025, 1, 2, 12)),
+    ]
+    filter_config = FilterConfig(
+        allowed_sender_ids=None,
+        allowed_types={MessageType.TEXT},
+        year=None,
+        include_self=True,
+    )
+
+    result = await TelegramCollector(FakeClient(messages[:2])).collect(
+        chat_identifier="Alice Example",
+        filter_config=filter_config,
+    )
+    assert [msg.message_id for msg in result.messages] == [1, 2]
+
+    # Out-of-order input still comes back sorted.
+    result = await TelegramCollector(FakeClient(messages)).collect(
+        chat_identifier="Alice Example",
+        filter_config=filter_config,
+    )
+    assert [msg.message_id for msg in result.messages] == [1, 3, 2]
+
+
+async def test_collector_reads_attached_sender_without_request():
+    message = FakeMessage(1, None, text="Hallo", date=utc(2025, 1, 2))
+    message.sender = SimpleNamespace(id=555, first_name="Bob", last_name=None)
+
+    async def fail():
+        raise AssertionError("get_sender should not be awaited")
+
+    message.get_sender = fail
+    filter_config = FilterConfig(
+        allowed_sender_ids=None,
+        allowed_types={MessageType.TEXT},
+        year=None,
+        include_self=True,
+    )
+
+    result = await TelegramCollector(FakeClient([message])).collect(
+        chat_identifier="Alice Example",
+        filter_config=filter_config,
+    )
+
+    assert [(msg.sender_id, msg.sender_display) for msg in result.messages] == [(555, "Bob")]
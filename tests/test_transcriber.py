@@ -1,22 +1,34 @@
+import sys
+import threading
 from pathlib import Path
 from types import SimpleNamespace
 
-from telegram_voice_transcriber.transcribe import WhisperTranscriber
+import pytest
+
+from telegram_voice_transcriber.transcribe import (
+    WhisperTranscriber,
+    collapse_repetitions,
+    parallel_workers,
+    replica_options,
+    select_compute_type,
+)
 
 
 class StubWhisperModel:
     def __init__(self):
         self.called_with = []
 
-    def transcribe(self, audio_path, language, beam_size, best_of, condition_on_previous_text, vad_filter):
+    def transcribe(self, audio_path, language, beam_size, best_of, temperature, condition_on_previous_text, vad_filter, vad_parameters):
         self.called_with.append(
             dict(
                 audio_path=audio_path,
                 language=language,
                 beam_size=beam_size,
                 best_of=best_of,
+                temperature=temperature,
                 condition_on_previous_text=condition_on_previous_text,
                 vad_filter=vad_filter,
+                vad_parameters=vad_parameters,
             )
         )
         segments = [
@@ -30,7 +42,6 @@ def test_transcriber_invokes_model_with_defaults(tmp_path: Path):
     model = StubWhisperModel()
     transcriber = WhisperTranscriber(model=model, language="de", beam_size=5, best_of=5)
     audio_path = tmp_path / "audio.ogg"
-    audio_path.write_bytes(b"fake")
 
     result = transcriber.transcribe(audio_path)
 
@@ -40,3 +51,257 @@ def test_transcriber_invokes_model_with_defaults(tmp_path: Path):
     assert model.called_with[0]["best_of"] == 5
     assert model.called_with[0]["condition_on_previous_text"] is False
     assert model.called_with[0]["vad_filter"] is True
+    assert model.called_with[0]["vad_parameters"] == {"min_silence_duration_ms": 500}
+
+
+def test_transcriber_decodes_greedily_by_default(tmp_path: Path):
+    model = StubBatchedModel()
+    transcriber = WhisperTranscriber(model=model)
+
+    transcriber.transcribe(tmp_path / "audio.ogg")
+
+    assert model.kwargs["beam_size"] == 1
+    assert model.kwargs["temperature"] == 0.0
+
+
+class StubBatchedModel:
+    def __init__(self):
+        self.kwargs = None
+
+    def transcribe(self, audio_path, **kwargs):
+        self.kwargs = kwargs
+        return [SimpleNamespace(text="Hallo")], None
+
+
+def test_transcriber_passes_batch_size_to_batched_model(tmp_path: Path):
+    model = StubBatchedModel()
+    transcriber = WhisperTranscriber(model=model, language="de", batch_size=16)
+
+    result = transcriber.transcribe(tmp_path / "audio.ogg")
+
+    assert result == "Hallo"
+    assert model.kwargs["batch_size"] == 16
+
+
+def test_select_compute_type_prefers_int8_float16_on_cuda(monkeypatch):
+    fake_ct2 = SimpleNamespace(
+        get_cuda_device_count=lambda: 1,
+        get_supported_compute_types=lambda device: {"float16", "int8_float16", "int8"},
+    )
+    monkeypatch.setitem(sys.modules, "ctranslate2", fake_ct2)
+
+    assert select_compute_type() == ("cuda", "int8_float16")
+
+
+def test_select_compute_type_uses_float16_without_int8_kernels(monkeypatch):
+    fake_ct2 = SimpleNamespace(
+        get_cuda_device_count=lambda: 1,
+        get_supported_compute_types=lambda device: {"float16", "float32"},
+    )
+    monkeypatch.setitem(sys.modules, "ctranslate2", fake_ct2)
+
+    assert select_compute_type() == ("cuda", "float16")
+
+
+def test_select_compute_type_falls_back_to_int8_on_cpu(monkeypatch):
+    fake_ct2 = SimpleNamespace(
+        get_cuda_device_count=lambda: 0,
+        get_supported_compute_types=lambda device: {"int8", "float32"},
+    )
+    monkeypatch.setitem(sys.modules, "ctranslate2", fake_ct2)
+
+    assert select_compute_type() == ("cpu", "int8")
+
+
+def test_select_compute_type_honours_cpu_override(monkeypatch):
+    fake_ct2 = SimpleNamespace(
+        get_cuda_device_count=lambda: 1,
+        get_supported_compute_types=lambda device: {"float16", "int8"} if device == "cuda" else {"int8"},
+    )
+    monkeypatch.setitem(sys.modules, "ctranslate2", fake_ct2)
+
+    assert select_compute_type("cpu") == ("cpu", "int8")
+
+
+def test_collapse_repetitions_removes_whisper_loops():
+    assert collapse_repetitions("ja ja ja ja ja ja genau") == "ja genau"
+    assert collapse_repetitions("bis morgen bis morgen bis morgen bis morgen") == "bis morgen"
+    assert collapse_repetitions("ja ja ja okay") == "ja ja ja okay"
+
+
+def test_cache_namespace_covers_decoding_settings():
+    base = WhisperTranscriber(model=None, model_name="small/int8")
+
+    assert base.cache_namespace() == WhisperTranscriber(model=None, model_name="small/int8").cache_namespace()
+    variants = [
+        WhisperTranscriber(model=None, model_name="small/float16"),
+        WhisperTranscriber(model=None, model_name="small/int8", language="en"),
+        WhisperTranscriber(model=None, model_name="small/int8", beam_size=5),
+        WhisperTranscriber(model=None, model_name="small/int8", collapse_repetitions=False),
+        WhisperTranscriber(model=None, model_name="small/int8", vad_filter=False),
+    ]
+    assert len({base.cache_namespace(), *(variant.cache_namespace() for variant in variants)}) == 6
+
+
+def test_transcribe_batch_keeps_input_order(tmp_path: Path):
+    class EchoModel:
+        def __init__(self):
+            self.threads = set()
+
+        def transcribe(self, audio_path, **kwargs):
+            self.threads.add(threading.get_ident())
+            return [SimpleNamespace(text=Path(audio_path).stem)], None
+
+    model = EchoModel()
+    transcriber = WhisperTranscriber(model=model, workers=3)
+    paths = [tmp_path / f"clip{index}.ogg" for index in range(5)]
+
+    assert transcriber.transcribe_batch(paths) == [f"clip{index}" for index in range(5)]
+    # Parallelism comes from the pipeline's executor, not from threads started here.
+    assert model.threads == {threading.get_ident()}
+
+
+def test_replica_options_spreads_over_all_gpus(monkeypatch):
+    fake_ct2 = SimpleNamespace(get_cuda_device_count=lambda: 2)
+    monkeypatch.setitem(sys.modules, "ctranslate2", fake_ct2)
+
+    options = replica_options("cuda")
+
+    assert options == {"device_index": [0, 1]}
+    assert parallel_workers(options) == 2
+
+
+def test_replica_options_splits_cpu_cores(monkeypatch):
+    monkeypatch.setattr("telegram_voice_transcriber.transcribe.os.cpu_count", lambda: 8)
+
+    assert replica_options("cpu") == {"cpu_threads": 4, "num_workers": 2}
+    assert replica_options("cpu", workers=4) == {"cpu_threads": 2, "num_workers": 4}
+
+
+def test_transcribe_batch_packs_files_into_one_call(monkeypatch, tmp_path: Path):
+    import numpy as np
+
+    lengths = {"a": 16000, "silent": 0, "b": 32000}
+    fake_fw = SimpleNamespace(
+        decode_audio=lambda path, sampling_rate: np.ones(lengths[Path(path).stem], dtype=np.float32)
+    )
+    monkeypatch.setattr("telegram_voice_transcriber.transcribe.faster_whisper_module", lambda: fake_fw)
+
+    class ClipModel:
+        def __init__(self):
+            self.calls = []
+
+        def transcribe(self, audio, clip_timestamps, **kwargs):
+            self.calls.append((len(audio), clip_timestamps, kwargs))
+            return [
+                SimpleNamespace(start=clip["start"], end=clip["end"], text=f" Teil {index} ")
+                for index, clip in enumerate(clip_timestamps)
+            ], None
+
+    model = ClipModel()
+    transcriber = WhisperTranscriber(model=model, batch_size=8, vad_filter=False)
+
+    result = transcriber.transcribe_batch([tmp_path / "a.ogg", tmp_path / "silent.ogg", tmp_path / "b.ogg"])
+
+    assert result == ["Teil 0", "", "Teil 1"]
+    assert len(model.calls) == 1
+    audio_length, clips, kwargs = model.calls[0]
+    assert audio_length == 48000
+    assert clips == [{"start": 0.0, "end": 1.0}, {"start": 1.0, "end": 3.0}]
+    assert kwargs["batch_size"] == 8
+    assert kwargs["vad_filter"] is False
+
+
+def test_transcribe_batch_maps_rounded_segments_to_their_file(monkeypatch, tmp_path: Path):
+    import numpy as np
+
+    # Lengths that are not multiples of 16 samples (one millisecond).
+    lengths = {"a": 16001, "b": 8003, "c": 4007}
+    fake_fw = SimpleNamespace(
+        decode_audio=lambda path, sampling_rate: np.ones(lengths[Path(path).stem], dtype=np.float32)
+    )
+    monkeypatch.setattr("telegram_voice_transcriber.transcribe.faster_whisper_module", lambda: fake_fw)
+
+    class RoundingModel:
+        def __init__(self):
+            self.audio_length = None
+
+        def transcribe(self, audio, clip_timestamps, **kwargs):
+            self.audio_length = len(audio)
+            segments = []
+            for index, clip in enumerate(clip_timestamps):
+                # The bounds faster-whisper slices with, and a 3-decimal start that
+                # ended up just before the clip (as with an unaligned file start).
+                start = int(clip["start"] * 16000)
+                end = int(clip["end"] * 16000)
+                assert start % 2000 == 0 and end % 2000 == 0
+                segments.append(
+                    SimpleNamespace(
+                        start=round(start / 16000 - 0.0006, 3),
+                        end=round(end / 16000, 3),
+                        text=f"Datei {index}",
+                    )
+                )
+            return segments, None
+
+    model = RoundingModel()
+    transcriber = WhisperTranscriber(model=model, batch_size=8, vad_filter=False)
+
+    result = transcriber.transcribe_batch([tmp_path / f"{name}.ogg" for name in lengths])
+
+    assert result == ["Datei 0", "Datei 1", "Datei 2"]
+    assert model.audio_length == 18000 + 10000 + 6000
+
+
+def test_transcriber_consumes_lazy_segments(tmp_path: Path, caplog):
+    class LazyModel:
+        def transcribe(self, audio_path, **kwargs):
+            def segments():
+                yield SimpleNamespace(text=" Hallo ")
+                yield SimpleNamespace(text="  ")
+                raise RuntimeError("decoder crashed")
+
+            return segments(), None
+
+    transcriber = WhisperTranscriber(model=LazyModel())
+
+    with pytest.raises(RuntimeError):
+        transcriber.transcribe(tmp_path / "audio.ogg")
+
+    assert "decoder crashed" in caplog.text
+
+
+def test_transcriber_skips_model_for_silent_audio(monkeypatch, tmp_path: Path):
+    speech = {"silent": [], "talk": [{"start": 0, "end": 8000}]}
+    fake_fw = SimpleNamespace(
+        decode_audio=lambda path, sampling_rate: Path(path).stem,
+        vad=SimpleNamespace(
+            VadOptions=lambda **kwargs: kwargs,
+            get_speech_timestamps=lambda audio, options: speech[audio],
+        ),
+    )
+    monkeypatch.setattr("telegram_voice_transcriber.transcribe.faster_whisper_module", lambda: fake_fw)
+
+    class DecodedAudioModel:
+        def __init__(self):
+            self.audio = []
+
+        def transcribe(self, audio, **kwargs):
+            self.audio.append(audio)
+            self.kwargs = kwargs
+            return [SimpleNamespace(text="Hallo")], None
+
+    model = DecodedAudioModel()
+    transcriber = WhisperTranscriber(model=model, skip_silence=True)
+
+    assert transcriber.transcribe(tmp_path / "silent.ogg") == ""
+    assert transcriber.transcribe(tmp_path / "talk.ogg") == "Hallo"
+    assert model.audio == ["talk"]
+    # The speech found up front is reused instead of running the VAD again.
+    assert model.kwargs["vad_filter"] is False
+    assert "vad_parameters" not in model.kwargs
+    assert model.kwargs["clip_timestamps"] == [0.0, 0.5]
+
+    batched = WhisperTranscriber(model=model, skip_silence=True, batch_size=8)
+    batched.transcribe(tmp_path / "talk.ogg")
+    assert model.kwargs["clip_timestamps"] == [{"start": 0.0, "end": 0.5}]
@@ -1,16 +1,30 @@
+from types import SimpleNamespace
+
 import pytest
-from unittest.mock import AsyncMock, MagicMock
 from telegram_voice_transcriber.web_auth import WebAuthManager, AuthState
 
 
+class FakeClient:
+    def __init__(self):
+        self.sent = []
+        self.sign_ins = []
+
+    async def is_user_authorized(self):
+        return False
+
+    async def send_code_request(self, phone):
+        self.sent.append(phone)
+
+    async def sign_in(self, **kwargs):
+        self.sign_ins.append(kwargs)
+
+    async def get_me(self):
+        return SimpleNamespace(id=123, first_name="Test")
+
+
 @pytest.fixture
-def mock_client():
-    client = MagicMock()
-    client.is_user_authorized = AsyncMock(return_value=False)
-    client.send_code_request = AsyncMock()
-    client.sign_in = AsyncMock()
-    client.get_me = AsyncMock(return_value=MagicMock(id=123, first_name="Test"))
-    return client
+def fake_client():
+    return FakeClient()
 
 
 def test_auth_manager_initial_state():
@@ -25,13 +39,12 @@ def test_auth_manager_set_credentials():
     assert manager.api_id == 123456
 
 
-@pytest.mark.asyncio
-async def test_auth_manager_send_code(mock_client):
+async def test_auth_manager_send_code(fake_client):
     manager = WebAuthManager()
     manager.set_credentials(api_id=123456, api_hash="abc123")
-    manager._client = mock_client
+    manager._client = fake_client
 
     await manager.send_code("+1234567890")
 
-    mock_client.send_code_request.assert_called_once_with("+1234567890")
+    assert fake_client.sent == ["+1234567890"]
     assert manager.state == AuthState.NEEDS_CODE
@@ -0,0 +1,41 @@
+from pathlib import Path
+
+import pytest
+
+from telegram_voice_transcriber.writer import FileWriter
+
+
+def test_file_writer_open_replaces_target_on_success(tmp_path: Path):
+    target = tmp_path / "out" / "chat.md"
+
+    with FileWriter().open(target) as handle:
+        handle.write("# Transkript\n")
+        assert not target.exists()
+
+    assert target.read_text(encoding="utf-8") == "# Transkript\n"
+    assert list(target.parent.iterdir()) == [target]
+
+
+def test_file_writer_open_keeps_old_file_on_error(tmp_path: Path):
+    target = tmp_path / "chat.md"
+    target.write_text("alt\n", encoding="utf-8")
+
+    with pytest.raises(RuntimeError):
+        with FileWriter().open(target) as handle:
+            handle.write("neu\n")
+            raise RuntimeError("abgebrochen")
+
+    assert target.read_text(encoding="utf-8") == "alt\n"
+    assert list(tmp_path.iterdir()) == [target]
+
+
+def test_file_writer_write_replaces_target(tmp_path: Path):
+    target = tmp_path / "out" / "chat.md"
+    writer = FileWriter()
+
+    writer.write(target, "# Transkript – Grüße\n")
+    assert target.read_text(encoding="utf-8") == "# Transkript – Grüße\n"
+
+    writer.write(target, iter(["a\n", "b\n"]))
+    assert target.read_text(encoding="utf-8") == "a\nb\n"
+    assert list(target.parent.iterdir()) == [target]